@@ -6,12 +6,23 @@ analysis/ 配下のスクリプトから共有される:
   - 証券コード正規化
   - 報告書様式コード推定
   - XBRLファイル収集
+  - XBRLファイル先読み
+  - 証券コードの軽量抽出（パイプライン実行前の絞り込み用）
+  - パイプライン結果のディスクキャッシュ
 """
+import functools
+import hashlib
 import logging
+import os
+import pickle
+import re
 import sys
+from collections.abc import Iterable
 from pathlib import Path
 from typing import Any
 
+from lxml import etree
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
@@ -22,8 +33,9 @@ from parser.xbrl_parser import XBRLParser
 from parser.context_resolver import ContextResolver
 from normalizer.fact_normalizer import FactNormalizer
 from financial.financial_master import FinancialMaster
-from config_loader import get_fact_keys, get_derived_keys
+from src.config_loader import get_fact_keys, get_derived_keys, load_taxonomy_mapping
 from constants import SKIP_FILENAME_PATTERNS
+from utils import scandir_xbrl
 
 logger = logging.getLogger(__name__)
 
@@ -31,22 +43,27 @@ FACT_KEYS = get_fact_keys()
 DERIVED_KEYS = get_derived_keys()
 
 XBRL_BASE_DIR = PROJECT_ROOT / "data" / "edinet" / "raw_xbrl"
+PIPELINE_CACHE_DIR = PROJECT_ROOT / ".cache" / "pipeline"
+
+_SKIP_RE = re.compile("|".join(map(re.escape, SKIP_FILENAME_PATTERNS)), re.IGNORECASE)
 
 
 def normalize_code(raw: Any) -> str:
     """EDINET 証券コードを4桁に正規化する。5桁末尾0なら削除。"""
-    s = str(raw).strip()
+    s = raw.strip() if isinstance(raw, str) else str(raw).strip()
     if len(s) == 5 and s.endswith("0"):
         return s[:4]
     return s
 
 
+@functools.lru_cache(maxsize=8192)
 def check_form_code(filename: str) -> str:
     """XBRL ファイル名から報告書様式コードを推定する。"""
-    parts = filename.split("-")
-    if len(parts) >= 2:
-        return f"{parts[0]}-{parts[1]}"
-    return "unknown"
+    i = filename.find("-")
+    if i < 0:
+        return "unknown"
+    j = filename.find("-", i + 1)
+    return filename if j < 0 else filename[:j]
 
 
 def run_pipeline(
@@ -70,11 +87,113 @@ def run_pipeline(
     return parsed, ctx_map, normalizer, normalized, result
 
 
+def peek_security_codes(xbrl_path: Path) -> set[str] | None:
+    """SecurityCodeDEI 系タグの値だけを拾い、正規化済み証券コードの集合を返す。
+
+    パイプライン（fact 抽出・正規化・計算）は実行しない。該当タグのみ iterparse の
+    tag フィルタで取り出す。XML が壊れている場合は判定不能として None を返す。
+    """
+    dei_tags = [tag for tag, key in load_taxonomy_mapping()["dei"] if key == "security_code"]
+    codes: set[str] = set()
+    try:
+        for _event, elem in etree.iterparse(
+            str(xbrl_path), events=("end",), tag=[f"{{*}}{t}" for t in dei_tags], huge_tree=True,
+        ):
+            if elem.text and elem.text.strip():
+                codes.add(normalize_code(elem.text))
+    except etree.XMLSyntaxError:
+        return None
+    return codes
+
+
+@functools.lru_cache(maxsize=None)
+def source_fingerprint(extra_paths: tuple[Path, ...] = ()) -> str:
+    """パイプライン結果に影響する設定・コードのハッシュを返す。
+
+    config/*.yaml, src/ 配下の .py, 本モジュール, extra_paths の内容から算出する。
+    いずれかが変わればキャッシュのディレクトリが変わり、既存キャッシュは使われない。
+    """
+    h = hashlib.sha256()
+    paths = sorted((PROJECT_ROOT / "config").glob("*.yaml"))
+    paths += sorted((PROJECT_ROOT / "src").rglob("*.py"))
+    paths += [Path(__file__).resolve(), *extra_paths]
+    for path in paths:
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def cache_file_for(cache_dir: Path, xbrl_path: Path) -> Path | None:
+    """XBRL ファイルのパス・mtime・サイズからキャッシュファイルのパスを返す。"""
+    try:
+        st = xbrl_path.stat()
+    except OSError:
+        return None
+    key = f"{xbrl_path}\0{st.st_mtime_ns}\0{st.st_size}"
+    return cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.pkl"
+
+
+def load_cache(cache_file: Path) -> Any | None:
+    """キャッシュを読み込む。存在しない・壊れている場合は None。"""
+    try:
+        with open(cache_file, "rb") as fh:
+            return pickle.load(fh)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def store_cache(cache_file: Path, obj: Any) -> None:
+    """一時ファイル経由で書き込み、並列実行時も壊れたキャッシュを残さない。"""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as fh:
+            pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def cached_run_pipeline(
+    xbrl_path: Path,
+) -> tuple[dict[str, Any], dict[str, Any], FactNormalizer, dict[str, Any], dict[str, Any]]:
+    """run_pipeline の結果を (パス, mtime, サイズ) をキーに .cache/pipeline へキャッシュする。
+
+    未変更ファイルの2回目以降はパース・正規化を行わずキャッシュを返す。
+    """
+    cache_file = cache_file_for(PIPELINE_CACHE_DIR / source_fingerprint(), xbrl_path)
+    if cache_file is not None:
+        cached = load_cache(cache_file)
+        if cached is not None:
+            return cached
+    out = run_pipeline(xbrl_path)
+    if cache_file is not None:
+        store_cache(cache_file, out)
+    return out
+
+
 def collect_xbrl_files(base_dir: Path | None = None) -> list[Path]:
     """XBRL ファイルを再帰収集し、スキップ対象を除外して返す。"""
     root = base_dir or XBRL_BASE_DIR
-    files: list[Path] = []
-    for f in root.rglob("*.xbrl"):
-        if not any(pat in f.name.lower() for pat in SKIP_FILENAME_PATTERNS):
-            files.append(f)
-    return sorted(files)
+    return sorted(map(Path, scandir_xbrl(str(root), _SKIP_RE)))
+
+
+def prefetch_files(paths: Iterable[Path]) -> None:
+    """paths の先読みをカーネルに依頼する（posix_fadvise WILLNEED）。
+
+    読み込みはカーネル側で非同期に行われるため、ワーカーのパース処理と
+    コールドキャッシュ時の I/O 待ちが重なる。posix_fadvise が使えない環境では何もしない。
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
@@ -11,23 +11,40 @@ NULL理由4分類スクリプト。
 
 使用例:
     python scripts/analysis/classify_null_reasons.py
+    python scripts/analysis/classify_null_reasons.py --keep-details  # 各社の分類結果を保持
+    python scripts/analysis/classify_null_reasons.py --cache  # 未変更ファイルの分類結果を再利用
 """
+import functools
 import logging
+import os
+import re
 import sys
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
 from _pipeline import (
     PROJECT_ROOT,
     FACT_KEYS,
+    cache_file_for,
     collect_xbrl_files,
+    load_cache,
     normalize_code,
     check_form_code,
+    prefetch_files,
     run_pipeline,
+    source_fingerprint,
+    store_cache,
 )
 
 logging.basicConfig(level=logging.WARNING)
 
+# 処理済みファイル数に対して先読みを先行させるファイル数
+PREFETCH_DEPTH = 256
+
+CACHE_DIR = PROJECT_ROOT / ".cache" / "classify"
+
 # =========================================================================
 # 会計基準差 NULL の静的ルール
 # =========================================================================
@@ -116,24 +133,29 @@ ACCT_STD_NORMALIZE = {
     "IFRS": "IFRS", "US GAAP": "US-GAAP", "US-GAAP": "US-GAAP",
 }
 
+# 全ヒントパターンの和集合（いずれかを含むタグのみ振り分け対象とする前段フィルタ）
+_HINT_ITEMS: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+    (key, tuple(pats)) for key, pats in EXTENDED_TAG_HINTS.items() if pats
+)
+_HINT_PATTERN = re.compile("|".join(
+    re.escape(pat) for pat in sorted({p for _, pats in _HINT_ITEMS for p in pats})
+))
+_BANK_PATTERN = re.compile("|".join(map(re.escape, BANK_INDICATOR_TAGS)))
+
 
 # =========================================================================
 # ヘルパー関数
 # =========================================================================
 
+@functools.lru_cache(maxsize=8192)
 def _tag_local(tag: str) -> str:
-    return tag.split(":")[-1] if ":" in tag else tag
+    return tag.rpartition(":")[2]
 
 
-def _has_tag_in_facts(facts: list[dict], patterns: list[str]) -> list[str]:
-    """raw facts に patterns のいずれかを含むタグが存在するか。見つかったパターンを返す。"""
-    found: list[str] = []
-    for pat in patterns:
-        for f in facts:
-            if pat in _tag_local(f.get("tag", "")):
-                found.append(pat)
-                break
-    return found
+def _annotate_tag_local(facts: list[dict]) -> None:
+    """各 fact にローカル名 tag_local を1回だけ付与する（以降の走査で再分割しない）。"""
+    for f in facts:
+        f["tag_local"] = _tag_local(f.get("tag", ""))
 
 
 def _get_context_date(ctx_ref: str, context_map: dict) -> str:
@@ -146,110 +168,117 @@ def _get_context_date(ctx_ref: str, context_map: dict) -> str:
     return ""
 
 
-def _find_matching_facts_detail_dated(
-    facts: list[dict],
-    patterns: list[str],
-    context_map: dict,
-    target_date: str | None,
-) -> tuple[bool, bool, bool]:
-    """日付認識版: target_date のコンテキストのみ対象で fact の存在と値を判定する。"""
-    if not target_date:
-        return _find_matching_facts_detail(facts, patterns)
+def _build_ctx_date_map(context_map: dict) -> dict[str, str]:
+    """contextRef → 該当日付 の対応表を1ファイルにつき1回だけ構築する。"""
+    return {ctx_ref: _get_context_date(ctx_ref, context_map) for ctx_ref in context_map}
 
-    tag_exists = False
-    has_value = False
-    for f in facts:
-        local = _tag_local(f.get("tag", ""))
-        for pat in patterns:
-            if pat in local:
-                ctx_date = _get_context_date(f.get("contextRef", ""), context_map)
-                if ctx_date != target_date:
-                    break
-                tag_exists = True
-                val = (f.get("value") or "").strip()
-                if val and not f.get("is_nil", False):
-                    has_value = True
-                break
-    return tag_exists, has_value, (tag_exists and not has_value)
 
+@functools.lru_cache(maxsize=65536)
+def _hint_keys_for(local: str) -> tuple[str, ...]:
+    """ローカルタグ名が該当する EXTENDED_TAG_HINTS のキーを返す。
 
-def _find_matching_facts_detail(
-    facts: list[dict], patterns: list[str],
-) -> tuple[bool, bool, bool]:
-    """patterns を含むタグの存在・値の状態を返す。"""
-    tag_exists = False
-    has_value = False
+    同一タグ名は期間・ファイルをまたいで繰り返し出現するため、プロセス内でキャッシュする。
+    """
+    if _HINT_PATTERN.search(local) is None:
+        return ()
+    return tuple(
+        key for key, patterns in _HINT_ITEMS
+        if any(pat in local for pat in patterns)
+    )
+
+
+def _fact_has_value(f: dict) -> bool:
+    """fact が xsi:nil でも空文字でもない値を持つか。"""
+    return bool((f.get("value") or "").strip()) and not f.get("is_nil", False)
+
+
+def _bucket_facts_by_key(facts: list[dict]) -> dict[str, list[bool]]:
+    """raw facts を1回だけ走査し、EXTENDED_TAG_HINTS のキーごとに該当 fact の値有無を振り分ける。
+
+    以降の判定に必要なのは「該当 fact の有無」と「値の有無」のみのため、
+    fact 辞書ではなく値有無フラグの列として保持する。
+    いずれのパターンも含まないタグは結合済み正規表現で先に除外する。
+    """
+    buckets: dict[str, list[bool]] = defaultdict(list)
     for f in facts:
-        local = _tag_local(f.get("tag", ""))
-        for pat in patterns:
-            if pat in local:
-                tag_exists = True
-                val = (f.get("value") or "").strip()
-                if val and not f.get("is_nil", False):
-                    has_value = True
-                break
-    return tag_exists, has_value, (tag_exists and not has_value)
+        keys = _hint_keys_for(f["tag_local"])
+        if not keys:
+            continue
+        has_value = _fact_has_value(f)
+        for key in keys:
+            buckets[key].append(has_value)
+    return buckets
 
 
-def _has_tag_in_consolidated_context_dated(
+def _partition_facts(
     facts: list[dict],
-    patterns: list[str],
-    context_map: dict,
-    target_date: str | None,
-) -> tuple[bool, bool, bool]:
-    """日付認識版: 連結/個別コンテキストでのタグ存在判定。"""
-    if not target_date:
-        return _has_tag_in_consolidated_context(facts, patterns)
-
-    in_consol = False
-    in_non_consol = False
-    consol_has_value = False
+    ctx_date_map: dict[str, str],
+    current_year_end: str | None,
+) -> dict[tuple[bool, bool], list[dict]]:
+    """facts を (当期末コンテキストか, 個別コンテキストか) の4区分に1回の走査で振り分ける。"""
+    partitions: dict[tuple[bool, bool], list[dict]] = {
+        (True, False): [], (True, True): [], (False, False): [], (False, True): [],
+    }
     for f in facts:
-        local = _tag_local(f.get("tag", ""))
         ctx_ref = f.get("contextRef", "")
-        for pat in patterns:
-            if pat in local:
-                ctx_date = _get_context_date(ctx_ref, context_map)
-                if ctx_date != target_date:
-                    break
-                val = (f.get("value") or "").strip()
-                is_nil = f.get("is_nil", False)
-                if "NonConsolidated" in ctx_ref:
-                    in_non_consol = True
-                else:
-                    in_consol = True
-                    if val and not is_nil:
-                        consol_has_value = True
-                break
-    return in_consol, in_non_consol, (in_consol and not consol_has_value)
+        is_current = ctx_date_map.get(ctx_ref, "") == current_year_end
+        partitions[(is_current, "NonConsolidated" in ctx_ref)].append(f)
+    return partitions
+
+
+def _find_matching_facts_detail(
+    consol: list[bool], non_consol: list[bool],
+) -> tuple[bool, bool, bool]:
+    """パターン一致済み fact（値有無フラグ列）の存在・値の状態を返す。"""
+    tag_exists = bool(consol or non_consol)
+    has_value = any(consol) or any(non_consol)
+    return tag_exists, has_value, (tag_exists and not has_value)
 
 
 def _has_tag_in_consolidated_context(
-    facts: list[dict], patterns: list[str],
+    consol: list[bool], non_consol: list[bool],
 ) -> tuple[bool, bool, bool]:
     """連結/個別コンテキストでのタグ存在判定。"""
-    in_consol = False
-    in_non_consol = False
-    consol_has_value = False
-    for f in facts:
-        local = _tag_local(f.get("tag", ""))
-        ctx_ref = f.get("contextRef", "")
-        for pat in patterns:
-            if pat in local:
-                val = (f.get("value") or "").strip()
-                is_nil = f.get("is_nil", False)
-                if "NonConsolidated" in ctx_ref:
-                    in_non_consol = True
-                else:
-                    in_consol = True
-                    if val and not is_nil:
-                        consol_has_value = True
+    in_consol = bool(consol)
+    return in_consol, bool(non_consol), (in_consol and not any(consol))
+
+
+@functools.cache
+def _std_null_reasons(
+    acct_std: str, is_bank: bool, is_reit: bool, consol: str,
+) -> dict[str, str]:
+    """会計基準差ルールをメタ情報の組ごとに1回だけ評価し、canonical key → 理由 を返す。"""
+    meta = {"acct_std": acct_std, "is_bank": is_bank, "is_reit": is_reit, "consol": consol}
+    reasons: dict[str, str] = {}
+    for key, rules in ACCOUNTING_STD_NULL_RULES.items():
+        for cond_fn, reason in rules:
+            if cond_fn(meta):
+                reasons[key] = reason
                 break
-    return in_consol, in_non_consol, (in_consol and not consol_has_value)
+    return reasons
+
+
+@functools.lru_cache(maxsize=65536)
+def _bank_patterns_for(local: str) -> frozenset[str]:
+    """ローカルタグ名に含まれる BANK_INDICATOR_TAGS のパターンを返す。"""
+    if _BANK_PATTERN.search(local) is None:
+        return frozenset()
+    return frozenset(pat for pat in BANK_INDICATOR_TAGS if pat in local)
 
 
 def _detect_bank(facts: list[dict]) -> bool:
-    return len(_has_tag_in_facts(facts, BANK_INDICATOR_TAGS)) >= 2
+    """BANK_INDICATOR_TAGS のうち2種類以上のタグが存在すれば銀行と判定する。
+
+    2種類見つかった時点で走査を打ち切る。
+    """
+    found: set[str] = set()
+    for f in facts:
+        pats = _bank_patterns_for(f["tag_local"])
+        if pats:
+            found |= pats
+            if len(found) >= 2:
+                return True
+    return False
 
 
 def _detect_reit(filename: str) -> bool:
@@ -264,22 +293,72 @@ def process_xbrl(xbrl_path: Path) -> dict | None:
     """1ファイルを処理し、分類に必要な情報を返す。"""
     try:
         parsed, ctx_map, normalizer, _normalized, result = run_pipeline(xbrl_path)
+        raw_std = result.get("accounting_standard") or ""
+        facts = parsed.get("facts", [])
+        _annotate_tag_local(facts)
+        ctx_date_map = _build_ctx_date_map(ctx_map)
+        current_year_end = normalizer._current_year_end
         return {
             "xbrl_path": str(xbrl_path),
             "xbrl_filename": xbrl_path.name,
             "security_code": normalize_code(result.get("security_code", "")),
             "accounting_standard": result.get("accounting_standard"),
+            "acct_std": ACCT_STD_NORMALIZE.get(raw_std, raw_std),
             "consolidation_type": result.get("consolidation_type"),
             "current_metrics": result.get("current_year", {}).get("metrics", {}),
-            "raw_facts": parsed.get("facts", []),
+            "raw_facts": facts,
             "form_code": check_form_code(xbrl_path.name),
-            "context_map": ctx_map,
-            "current_year_end": normalizer._current_year_end,
+            "ctx_date_map": ctx_date_map,
+            "fact_partitions": _partition_facts(facts, ctx_date_map, current_year_end),
+            "current_year_end": current_year_end,
         }
     except Exception as e:
         return {"xbrl_path": str(xbrl_path), "error": str(e)}
 
 
+def _worker(xbrl_path: Path, cache_dir: Path | None = None) -> dict:
+    """ワーカープロセスで1ファイルを処理・NULL分類し、集計用の最小限の情報のみ返す。
+
+    raw_facts / ctx_date_map はワーカー内で破棄し、プロセス間の転送量を抑える。
+    cache_dir 指定時は、未変更ファイルの結果をディスクキャッシュから返す。
+    """
+    cache_file = cache_file_for(cache_dir, xbrl_path) if cache_dir is not None else None
+    if cache_file is not None:
+        cached = load_cache(cache_file)
+        if cached is not None:
+            return cached
+    out = _classify_file(xbrl_path)
+    if cache_file is not None and "error" not in out:
+        store_cache(cache_file, out)
+    return out
+
+
+def _classify_file(xbrl_path: Path) -> dict:
+    """1ファイルを処理・NULL分類し、集計用の最小限の情報を返す。"""
+    r = process_xbrl(xbrl_path)
+    if "error" in r:
+        return r
+    has_metrics = bool(r.get("current_metrics"))
+    cls = classify_nulls(r) if has_metrics else None
+    # 集計用の部分カウンタもワーカー側で作り、親プロセスは Counter の加算のみ行う
+    partial_counts: dict[str, Counter] = {}
+    partial_total: Counter = Counter()
+    if cls is not None:
+        for category, items in cls.items():
+            keys = [key for key, _reason in items]
+            partial_counts[category] = Counter(keys)
+            partial_total.update(keys)
+    return {
+        "security_code": r["security_code"],
+        "acct_std": r["acct_std"],
+        "form_code": r.get("form_code", ""),
+        "has_metrics": has_metrics,
+        "classification": cls,
+        "global_counts": partial_counts,
+        "per_key_total_null": partial_total,
+    }
+
+
 # =========================================================================
 # NULL 分類
 # =========================================================================
@@ -292,15 +371,32 @@ def classify_nulls(result: dict) -> dict[str, list[tuple[str, str]]]:
     """
     metrics = result.get("current_metrics", {})
     raw_facts = result.get("raw_facts", [])
-    context_map = result.get("context_map", {})
+    ctx_date_map = result.get("ctx_date_map")
+    if ctx_date_map is None:
+        ctx_date_map = _build_ctx_date_map(result.get("context_map", {}))
     current_year_end = result.get("current_year_end")
-    raw_std = result.get("accounting_standard") or ""
-    acct_std = ACCT_STD_NORMALIZE.get(raw_std, raw_std)
+    acct_std = result.get("acct_std")
+    if acct_std is None:
+        raw_std = result.get("accounting_standard") or ""
+        acct_std = ACCT_STD_NORMALIZE.get(raw_std, raw_std)
     is_bank = _detect_bank(raw_facts)
     is_reit = _detect_reit(result.get("xbrl_filename", ""))
     consol = result.get("consolidation_type", "")
 
-    meta = {"acct_std": acct_std, "is_bank": is_bank, "is_reit": is_reit, "consol": consol}
+    std_reasons = _std_null_reasons(acct_std, is_bank, is_reit, consol)
+
+    # 当期末コンテキストの fact のみを対象に、連結/個別の区分ごとに判定する
+    partitions = result.get("fact_partitions")
+    if partitions is None:
+        partitions = _partition_facts(raw_facts, ctx_date_map, current_year_end)
+    if current_year_end:
+        consol_facts = partitions[(True, False)]
+        non_consol_facts = partitions[(True, True)]
+    else:
+        consol_facts = partitions[(True, False)] + partitions[(False, False)]
+        non_consol_facts = partitions[(True, True)] + partitions[(False, True)]
+    consol_buckets = _bucket_facts_by_key(consol_facts)
+    non_consol_buckets = _bucket_facts_by_key(non_consol_facts)
     classification: dict[str, list[tuple[str, str]]] = {
         "経済実態": [], "会計基準差": [], "空値": [], "取得失敗": [],
     }
@@ -309,23 +405,17 @@ def classify_nulls(result: dict) -> dict[str, list[tuple[str, str]]]:
         if value is not None:
             continue
 
-        if key in ACCOUNTING_STD_NULL_RULES:
-            matched = False
-            for cond_fn, reason in ACCOUNTING_STD_NULL_RULES[key]:
-                if cond_fn(meta):
-                    classification["会計基準差"].append((key, reason))
-                    matched = True
-                    break
-            if matched:
-                continue
+        std_reason = std_reasons.get(key)
+        if std_reason is not None:
+            classification["会計基準差"].append((key, std_reason))
+            continue
 
-        hints = EXTENDED_TAG_HINTS.get(key, [])
-        if hints:
+        if EXTENDED_TAG_HINTS.get(key):
+            consol_hits = consol_buckets.get(key, [])
+            non_consol_hits = non_consol_buckets.get(key, [])
             if key in BS_DEBT_KEYS and consol == "consolidated":
                 in_consol, in_non_consol, consol_all_nil = (
-                    _has_tag_in_consolidated_context_dated(
-                        raw_facts, hints, context_map, current_year_end,
-                    )
+                    _has_tag_in_consolidated_context(consol_hits, non_consol_hits)
                 )
                 if in_consol:
                     if consol_all_nil:
@@ -343,8 +433,8 @@ def classify_nulls(result: dict) -> dict[str, list[tuple[str, str]]]:
                     )
                     continue
             else:
-                tag_exists, has_value, all_nil = _find_matching_facts_detail_dated(
-                    raw_facts, hints, context_map, current_year_end,
+                tag_exists, has_value, all_nil = _find_matching_facts_detail(
+                    consol_hits, non_consol_hits,
                 )
                 if tag_exists:
                     if all_nil:
@@ -371,7 +461,12 @@ def classify_nulls(result: dict) -> dict[str, list[tuple[str, str]]]:
 # レポート出力
 # =========================================================================
 
-def main() -> list[dict]:
+def main(keep_details: bool = False, use_cache: bool = False) -> list[dict]:
+    """NULL理由4分類レポートを出力する。
+
+    keep_details が True の場合のみ各社の分類結果を保持して返す（既定では空リスト）。
+    use_cache が True の場合、未変更ファイルの分類結果を .cache/classify から再利用する。
+    """
     xbrl_files = collect_xbrl_files()
 
     print("=" * 90)
@@ -379,49 +474,71 @@ def main() -> list[dict]:
     print("=" * 90)
     print(f"\n対象XBRLファイル数: {len(xbrl_files)}")
 
-    results: list[dict] = []
-    errors: list[dict] = []
-    for xf in xbrl_files:
-        r = process_xbrl(xf)
-        if r and "error" in r:
-            errors.append(r)
-        elif r:
-            results.append(r)
-
-    print(f"処理成功: {len(results)} / 処理失敗: {len(errors)}")
-
     global_counts: dict[str, Counter] = {
         "経済実態": Counter(), "会計基準差": Counter(), "空値": Counter(), "取得失敗": Counter(),
     }
     per_key_total_null: Counter = Counter()
+    nil_examples: dict[str, list[tuple[str, str]]] = defaultdict(list)
+    fail_examples: dict[str, list[tuple[str, str]]] = defaultdict(list)
+    std_reasons: dict[str, Counter] = defaultdict(Counter)
     total_companies = 0
+    n_success = 0
+    n_error = 0
     per_company_details: list[dict] = []
 
-    for r in results:
-        metrics = r.get("current_metrics", {})
-        if not metrics:
-            continue
-        total_companies += 1
-        cls = classify_nulls(r)
-        per_company_details.append({
-            "security_code": r["security_code"],
-            "acct_std": ACCT_STD_NORMALIZE.get(r.get("accounting_standard", ""), ""),
-            "form_code": r.get("form_code", ""),
-            "classification": cls,
-        })
-        for category, items in cls.items():
-            for key, _reason in items:
-                global_counts[category][key] += 1
-                per_key_total_null[key] += 1
+    # 各社の分類結果は受け取った時点で集計器へ反映し、保持しない（--keep-details 指定時のみ保持）
+    max_workers = os.cpu_count() or 1
+    chunksize = max(1, len(xbrl_files) // (max_workers * 4))
+    prefetch_files(xbrl_files[:PREFETCH_DEPTH])
+    cache_dir: Path | None = None
+    if use_cache:
+        cache_dir = CACHE_DIR / source_fingerprint((Path(__file__).resolve(),))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(_worker, xbrl_files, repeat(cache_dir), chunksize=chunksize)
+        for i, r in enumerate(results):
+            prefetch_files(xbrl_files[i + PREFETCH_DEPTH:i + PREFETCH_DEPTH + 1])
+            if "error" in r:
+                n_error += 1
+                continue
+            n_success += 1
+            if not r["has_metrics"]:
+                continue
+            total_companies += 1
+            cls = r["classification"]
+            security_code = r["security_code"]
+            if keep_details:
+                per_company_details.append({
+                    "security_code": security_code,
+                    "acct_std": r["acct_std"],
+                    "form_code": r["form_code"],
+                    "classification": cls,
+                })
+            for category, counts in r["global_counts"].items():
+                global_counts[category] += counts
+            per_key_total_null += r["per_key_total_null"]
+            for key, reason in cls["空値"]:
+                if len(nil_examples[key]) < 3:
+                    nil_examples[key].append((security_code, reason))
+            for key, reason in cls["取得失敗"]:
+                if len(fail_examples[key]) < 3:
+                    fail_examples[key].append((security_code, reason))
+            for key, reason in cls["会計基準差"]:
+                std_reasons[key][reason] += 1
+
+    # レポート本文は行単位でバッファし、最後にまとめて書き出す
+    lines: list[str] = []
+    out = lines.append
+
+    out(f"処理成功: {n_success} / 処理失敗: {n_error}")
 
     # --- 1. キー別 NULL 分類サマリー ---
-    print(f"\n{'=' * 90}")
-    print(f"  1. Canonical Key 別 NULL 分類 (全{total_companies}社)")
-    print(f"{'=' * 90}")
+    out(f"\n{'=' * 90}")
+    out(f"  1. Canonical Key 別 NULL 分類 (全{total_companies}社)")
+    out(f"{'=' * 90}")
     all_null_keys = sorted(per_key_total_null.keys(), key=lambda k: -per_key_total_null[k])
     header = f"{'canonical_key':<45} {'合計':>5} {'経済実態':>6} {'基準差':>6} {'空値':>6} {'取得失敗':>6} {'率%':>6}"
-    print(f"\n{header}")
-    print("-" * 100)
+    out(f"\n{header}")
+    out("-" * 100)
     for key in all_null_keys:
         total_null = per_key_total_null[key]
         eco = global_counts["経済実態"][key]
@@ -429,99 +546,90 @@ def main() -> list[dict]:
         nil_empty = global_counts["空値"][key]
         fail = global_counts["取得失敗"][key]
         rate = total_null / total_companies * 100 if total_companies > 0 else 0
-        print(f"  {key:<43} {total_null:>5} {eco:>6} {std:>6} {nil_empty:>6} {fail:>6} {rate:>5.1f}%")
+        out(f"  {key:<43} {total_null:>5} {eco:>6} {std:>6} {nil_empty:>6} {fail:>6} {rate:>5.1f}%")
 
     # --- 2. カテゴリ別集計 ---
     for category in ("経済実態", "会計基準差", "空値", "取得失敗"):
-        print(f"\n{'=' * 90}")
-        print(f"  2-{['経済実態','会計基準差','空値','取得失敗'].index(category)+1}. {category}NULL 詳細")
-        print(f"{'=' * 90}")
+        out(f"\n{'=' * 90}")
+        out(f"  2-{['経済実態','会計基準差','空値','取得失敗'].index(category)+1}. {category}NULL 詳細")
+        out(f"{'=' * 90}")
         counts = global_counts[category]
         if not counts:
-            print("  (該当なし)")
+            out("  (該当なし)")
             continue
         for key, cnt in counts.most_common():
             rate = cnt / total_companies * 100
-            print(f"  {key:<43} {cnt:>5}社 ({rate:>5.1f}%)")
+            out(f"  {key:<43} {cnt:>5}社 ({rate:>5.1f}%)")
 
     # --- 3. 空値NULL代表例 ---
-    print(f"\n{'=' * 90}")
-    print(f"  3. 空値NULL 代表例 (xsi:nil / 空値 - 正常欠損)")
-    print(f"{'=' * 90}")
-    nil_examples: dict[str, list[tuple[str, str]]] = defaultdict(list)
-    for d in per_company_details:
-        for key, reason in d["classification"]["空値"]:
-            if len(nil_examples[key]) < 3:
-                nil_examples[key].append((d["security_code"], reason))
+    out(f"\n{'=' * 90}")
+    out(f"  3. 空値NULL 代表例 (xsi:nil / 空値 - 正常欠損)")
+    out(f"{'=' * 90}")
     if not nil_examples:
-        print("  (空値NULLなし)")
+        out("  (空値NULLなし)")
     else:
         for key in sorted(nil_examples.keys()):
             cnt = global_counts["空値"][key]
             rate = cnt / total_companies * 100
-            print(f"\n  [{key}] {cnt}社 ({rate:.1f}%)")
+            out(f"\n  [{key}] {cnt}社 ({rate:.1f}%)")
             for sc, reason in nil_examples[key]:
-                print(f"    - {sc}: {reason}")
+                out(f"    - {sc}: {reason}")
 
     # --- 4. 取得失敗NULL代表例 ---
-    print(f"\n{'=' * 90}")
-    print(f"  4. 取得失敗NULL 代表例 (taxonomy_mapping.yaml 改善候補)")
-    print(f"{'=' * 90}")
-    fail_examples: dict[str, list[tuple[str, str]]] = defaultdict(list)
-    for d in per_company_details:
-        for key, reason in d["classification"]["取得失敗"]:
-            if len(fail_examples[key]) < 3:
-                fail_examples[key].append((d["security_code"], reason))
+    out(f"\n{'=' * 90}")
+    out(f"  4. 取得失敗NULL 代表例 (taxonomy_mapping.yaml 改善候補)")
+    out(f"{'=' * 90}")
     if not fail_examples:
-        print("  (取得失敗NULLなし)")
+        out("  (取得失敗NULLなし)")
     else:
         for key in sorted(fail_examples.keys()):
             cnt = global_counts["取得失敗"][key]
             rate = cnt / total_companies * 100
-            print(f"\n  [{key}] {cnt}社 ({rate:.1f}%)")
+            out(f"\n  [{key}] {cnt}社 ({rate:.1f}%)")
             for sc, reason in fail_examples[key]:
-                print(f"    - {sc}: {reason}")
+                out(f"    - {sc}: {reason}")
 
     # --- 5. 会計基準差NULL内訳 ---
-    print(f"\n{'=' * 90}")
-    print(f"  5. 会計基準差NULL 内訳")
-    print(f"{'=' * 90}")
-    std_reasons: dict[str, Counter] = defaultdict(Counter)
-    for d in per_company_details:
-        for key, reason in d["classification"]["会計基準差"]:
-            std_reasons[key][reason] += 1
+    out(f"\n{'=' * 90}")
+    out(f"  5. 会計基準差NULL 内訳")
+    out(f"{'=' * 90}")
     if not std_reasons:
-        print("  (該当なし)")
+        out("  (該当なし)")
     else:
         for key, reason_counts in sorted(std_reasons.items()):
-            print(f"\n  [{key}]")
+            out(f"\n  [{key}]")
             for reason, cnt in reason_counts.most_common():
-                print(f"    - {reason}: {cnt}社")
+                out(f"    - {reason}: {cnt}社")
 
     # --- 6. 全体サマリー ---
-    print(f"\n{'=' * 90}")
-    print(f"  6. 全体サマリー")
-    print(f"{'=' * 90}")
+    out(f"\n{'=' * 90}")
+    out(f"  6. 全体サマリー")
+    out(f"{'=' * 90}")
     total_eco = sum(global_counts["経済実態"].values())
     total_std = sum(global_counts["会計基準差"].values())
     total_nil = sum(global_counts["空値"].values())
     total_fail = sum(global_counts["取得失敗"].values())
     grand_total = total_eco + total_std + total_nil + total_fail
-    print(f"\n  全NULL件数:      {grand_total}")
+    out(f"\n  全NULL件数:      {grand_total}")
     if grand_total:
-        print(f"  経済実態NULL:    {total_eco} ({total_eco/grand_total*100:.1f}%)")
-        print(f"  会計基準差NULL:  {total_std} ({total_std/grand_total*100:.1f}%)")
-        print(f"  空値NULL:        {total_nil} ({total_nil/grand_total*100:.1f}%)")
-        print(f"  取得失敗NULL:    {total_fail} ({total_fail/grand_total*100:.1f}%)")
+        out(f"  経済実態NULL:    {total_eco} ({total_eco/grand_total*100:.1f}%)")
+        out(f"  会計基準差NULL:  {total_std} ({total_std/grand_total*100:.1f}%)")
+        out(f"  空値NULL:        {total_nil} ({total_nil/grand_total*100:.1f}%)")
+        out(f"  取得失敗NULL:    {total_fail} ({total_fail/grand_total*100:.1f}%)")
     if total_fail > 0:
-        print(f"\n  [WARN] 取得失敗NULLが存在します。taxonomy_mapping.yaml の拡張を検討してください。")
+        out(f"\n  [WARN] 取得失敗NULLが存在します。taxonomy_mapping.yaml の拡張を検討してください。")
     elif total_nil > 0:
-        print(f"\n  [OK] 取得失敗NULLなし。空値NULL {total_nil}件は xsi:nil/空値による正常欠損です。")
+        out(f"\n  [OK] 取得失敗NULLなし。空値NULL {total_nil}件は xsi:nil/空値による正常欠損です。")
     else:
-        print(f"\n  [OK] 取得失敗NULL・空値NULLなし。カバレッジは十分です。")
-    print()
+        out(f"\n  [OK] 取得失敗NULL・空値NULLなし。カバレッジは十分です。")
+    out("")
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
     return per_company_details
 
 
 if __name__ == "__main__":
-    main()
+    main(
+        keep_details="--keep-details" in sys.argv[1:],
+        use_cache="--cache" in sys.argv[1:],
+    )
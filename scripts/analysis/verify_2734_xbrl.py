@@ -12,10 +12,13 @@
   xbrl_path_or_doc_id 省略時は data/edinet/raw_xbrl 以下で S100XL6L を検索。
 """
 import logging
+import re
 import sys
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 
-from _pipeline import PROJECT_ROOT, run_pipeline
+from _pipeline import PROJECT_ROOT, scandir_xbrl, run_pipeline
 
 logging.basicConfig(level=logging.WARNING)
 
@@ -39,12 +42,29 @@ LEASE_TAGS = [
     "LeaseLiabilitiesNCLIFRS",
     "LeaseLiabilitiesCLIFRS",
 ]
+# BSアンカー日付検出に使うタグ（部分一致）
+ANCHOR_TAGS = ("TotalAssets", "LiabilitiesAndNetAssets", "NetAssets")
 
+# 借入・リースいずれかのパターンを含むかを1回の走査で判定する前段フィルタ
+_DEBT_TAG_RE = re.compile("|".join(map(re.escape, BORROW_TAGS + LEASE_TAGS)))
 
+
+@lru_cache(maxsize=4096)
 def tag_local(tag: str) -> str:
     return tag.split(":")[-1] if ":" in tag else tag
 
 
+@lru_cache(maxsize=4096)
+def classify_local(local: str) -> tuple[str | None, str | None, bool]:
+    """ローカル名の (最初に部分一致した借入パターン, 同リースパターン, アンカータグか) を返す"""
+    is_anchor = any(kw in local for kw in ANCHOR_TAGS)
+    if _DEBT_TAG_RE.search(local) is None:
+        return None, None, is_anchor
+    borrow = next((pat for pat in BORROW_TAGS if pat in local), None)
+    lease = next((pat for pat in LEASE_TAGS if pat in local), None)
+    return borrow, lease, is_anchor
+
+
 def _output_conclusion_without_xbrl() -> None:
     """XBRLなし時のコード・YAML分析結論"""
     print("=" * 90)
@@ -94,13 +114,20 @@ def _output_conclusion_without_xbrl() -> None:
 """)
 
 
-def find_xbrl(doc_id: str) -> Path | None:
+@lru_cache(maxsize=1)
+def _all_xbrl() -> tuple[str, ...]:
+    """raw_xbrl 配下の全 .xbrl パス（プロセス内で1回だけ走査する）"""
     base = PROJECT_ROOT / "data" / "edinet" / "raw_xbrl"
     if not base.exists():
-        return None
-    for f in base.rglob("*.xbrl"):
-        if doc_id in str(f):
-            return f
+        return ()
+    return tuple(scandir_xbrl(str(base), skip_re=None))
+
+
+def find_xbrl(doc_id: str) -> Path | None:
+    # doc_id はファイル名ではなくディレクトリ名に含まれるため、パス全体で判定する
+    for path in _all_xbrl():
+        if doc_id in path:
+            return Path(path)
     return None
 
 
@@ -146,112 +173,106 @@ def main() -> None:
     current_year_end = normalizer._current_year_end
     prior_year_end = normalizer._prior_year_end
 
-    print(f"\ncurrent_year_end: {current_year_end}")
-    print(f"prior_year_end: {prior_year_end}")
+    # 以降のレポートは行バッファに溜め、最後に1回で書き出す
+    lines: list[str] = []
+    out = lines.append
 
-    # --- 検証①: 借入金タグ ---
-    print("\n" + "=" * 90)
-    print("  検証①: 借入金関連タグ (raw XBRL fact一覧)")
-    print("=" * 90)
+    out(f"\ncurrent_year_end: {current_year_end}")
+    out(f"prior_year_end: {prior_year_end}")
 
-    borrow_facts = []
+    # 借入・リース・アンカー日付の抽出を facts の1回の走査でまとめて行う
+    borrow_facts: list[tuple[str, dict]] = []
+    lease_facts: list[tuple[str, dict]] = []
+    debt_facts: list[dict] = []
+    date_counts: Counter = Counter()  # 簡易アンカー日付検出（TotalAssets等のinstant日付分布）
+    get_ctx = ctx_map.get
     for f in facts:
-        local = tag_local(f.get("tag", ""))
-        for pat in BORROW_TAGS:
-            if pat in local:
-                borrow_facts.append((pat, f))
-                break
+        get = f.get
+        borrow_pat, lease_pat, is_anchor = classify_local(tag_local(get("tag", "")))
+        if borrow_pat:
+            borrow_facts.append((borrow_pat, f))
+        if lease_pat:
+            lease_facts.append((lease_pat, f))
+        if borrow_pat or lease_pat:
+            debt_facts.append(f)
+        if not is_anchor:
+            continue
+        ctx_ref = get("contextRef", "")
+        # メンバー付き（NonConsolidatedMember を含む）・個別のコンテキストは対象外
+        if "Member" in ctx_ref or "NonConsolidated" in ctx_ref:
+            continue
+        ctx = get_ctx(ctx_ref)
+        if ctx is None or ctx.get("type") != "instant":
+            continue
+        if get("is_nil", False) or not (get("value") or "").strip():
+            continue
+        date = ctx.get("date", "")
+        if date:
+            date_counts[date] += 1
+
+    # --- 検証①: 借入金タグ ---
+    out("\n" + "=" * 90)
+    out("  検証①: 借入金関連タグ (raw XBRL fact一覧)")
+    out("=" * 90)
 
     if not borrow_facts:
-        print("  (該当タグなし)")
+        out("  (該当タグなし)")
     else:
         for pat, f in sorted(borrow_facts, key=lambda x: (x[1].get("contextRef", ""), x[0])):
             ctx_ref = f.get("contextRef", "")
             info = get_context_info(ctx_ref, ctx_map)
             val = f.get("value", "").strip()
             is_nil = f.get("is_nil", False)
-            print(f"\n  tag: {f.get('tag')}")
-            print(f"    contextRef: {ctx_ref}")
-            print(f"    type: {info.get('type')}, date: {info.get('date', info.get('end_date', '-'))}")
-            print(f"    consolidated: {info.get('consolidated', '-')}")
-            print(f"    value: {val if val else '(empty)'} {'[xsi:nil]' if is_nil else ''}")
+            out(f"\n  tag: {f.get('tag')}")
+            out(f"    contextRef: {ctx_ref}")
+            out(f"    type: {info.get('type')}, date: {info.get('date', info.get('end_date', '-'))}")
+            out(f"    consolidated: {info.get('consolidated', '-')}")
+            out(f"    value: {val if val else '(empty)'} {'[xsi:nil]' if is_nil else ''}")
 
     # --- 検証②: リース債務タグ ---
-    print("\n" + "=" * 90)
-    print("  検証②: リース債務関連タグ (raw XBRL fact一覧)")
-    print("=" * 90)
-
-    lease_facts = []
-    for f in facts:
-        local = tag_local(f.get("tag", ""))
-        for pat in LEASE_TAGS:
-            if pat in local:
-                lease_facts.append((pat, f))
-                break
+    out("\n" + "=" * 90)
+    out("  検証②: リース債務関連タグ (raw XBRL fact一覧)")
+    out("=" * 90)
 
     if not lease_facts:
-        print("  (該当タグなし)")
+        out("  (該当タグなし)")
     else:
         for pat, f in sorted(lease_facts, key=lambda x: (x[1].get("contextRef", ""), x[0])):
             ctx_ref = f.get("contextRef", "")
             info = get_context_info(ctx_ref, ctx_map)
             val = f.get("value", "").strip()
             is_nil = f.get("is_nil", False)
-            print(f"\n  tag: {f.get('tag')}")
-            print(f"    contextRef: {ctx_ref}")
-            print(f"    type: {info.get('type')}, date: {info.get('date', info.get('end_date', '-'))}")
-            print(f"    consolidated: {info.get('consolidated', '-')}")
-            print(f"    value: {val if val else '(empty)'} {'[xsi:nil]' if is_nil else ''}")
+            out(f"\n  tag: {f.get('tag')}")
+            out(f"    contextRef: {ctx_ref}")
+            out(f"    type: {info.get('type')}, date: {info.get('date', info.get('end_date', '-'))}")
+            out(f"    consolidated: {info.get('consolidated', '-')}")
+            out(f"    value: {val if val else '(empty)'} {'[xsi:nil]' if is_nil else ''}")
 
     # --- 検証③: BSアンカー方式 ---
-    print("\n" + "=" * 90)
-    print("  検証③: BSアンカー方式の影響")
-    print("=" * 90)
+    out("\n" + "=" * 90)
+    out("  検証③: BSアンカー方式の影響")
+    out("=" * 90)
 
-    # 簡易アンカー日付検出（TotalAssets等のinstant日付分布）
-    from collections import Counter
-    date_counts: Counter = Counter()
-    for f in facts:
-        local = tag_local(f.get("tag", ""))
-        if not any(kw in local for kw in ("TotalAssets", "LiabilitiesAndNetAssets", "NetAssets")):
-            continue
-        ctx_ref = f.get("contextRef", "")
-        if "Member" in ctx_ref and "NonConsolidatedMember" not in ctx_ref:
-            continue
-        if "NonConsolidated" in ctx_ref:
-            continue
-        ctx = ctx_map.get(ctx_ref, {})
-        if ctx.get("type") != "instant":
-            continue
-        val = (f.get("value") or "").strip()
-        if not val or f.get("is_nil", False):
-            continue
-        date = ctx.get("date", "")
-        if date:
-            date_counts[date] += 1
-
-    print(f"\n  アンカータグ(TotalAssets等)のinstant日付分布:")
+    out(f"\n  アンカータグ(TotalAssets等)のinstant日付分布:")
     for d, cnt in date_counts.most_common():
         marker = " <- 採用" if d == current_year_end else ""
-        print(f"    {d}: {cnt}件{marker}")
+        out(f"    {d}: {cnt}件{marker}")
 
     anchor_date = date_counts.most_common(1)[0][0] if date_counts else None
     if anchor_date and anchor_date != current_year_end:
-        print(f"\n  [BSアンカーフォールバック] duration由来={current_year_end} -> アンカー={anchor_date}")
-        print(f"  借入・リースタグが {anchor_date} のinstantに存在するか確認:")
-        for f in facts:
-            local = tag_local(f.get("tag", ""))
-            if any(p in local for p in BORROW_TAGS + LEASE_TAGS):
-                ctx = ctx_map.get(f.get("contextRef", ""), {})
-                if ctx.get("type") == "instant" and ctx.get("date") == anchor_date:
-                    print(f"    {f.get('tag')}: {f.get('value')} (contextRef={f.get('contextRef')})")
+        out(f"\n  [BSアンカーフォールバック] duration由来={current_year_end} -> アンカー={anchor_date}")
+        out(f"  借入・リースタグが {anchor_date} のinstantに存在するか確認:")
+        for f in debt_facts:
+            ctx = ctx_map.get(f.get("contextRef", ""), {})
+            if ctx.get("type") == "instant" and ctx.get("date") == anchor_date:
+                out(f"    {f.get('tag')}: {f.get('value')} (contextRef={f.get('contextRef')})")
     else:
-        print(f"\n  アンカー日付は duration 由来と同一: {current_year_end}")
+        out(f"\n  アンカー日付は duration 由来と同一: {current_year_end}")
 
     # --- YAMLマッピング該当箇所 ---
-    print("\n" + "=" * 90)
-    print("  YAMLマッピング該当箇所抜粋")
-    print("=" * 90)
+    out("\n" + "=" * 90)
+    out("  YAMLマッピング該当箇所抜粋")
+    out("=" * 90)
 
     yaml_excerpt = """
   # --- current_portion_of_long_term_borrowings ---
@@ -276,14 +297,14 @@ def main() -> None:
   - tag: "LongTermLeaseObligations"
     key: "long_term_lease_obligations"
 """
-    print(yaml_excerpt)
+    out(yaml_excerpt)
 
     # --- マッチングロジック確認 ---
-    print("\n" + "=" * 90)
-    print("  マッチングロジック確認 (_tag_matches: keyword in tag_local)")
-    print("=" * 90)
+    out("\n" + "=" * 90)
+    out("  マッチングロジック確認 (_tag_matches: keyword in tag_local)")
+    out("=" * 90)
 
-    print("""
+    out("""
   keyword "LongTermLoansPayable" in "CurrentPortionOfLongTermLoansPayable" => True (部分一致)
   keyword "CurrentPortionOfLongTermLoansPayable" in "CurrentPortionOfLongTermLoansPayable" => True
 
@@ -292,19 +313,19 @@ def main() -> None:
 """)
 
     # --- 正規化結果 ---
-    print("\n" + "=" * 90)
-    print("  正規化結果 (FactNormalizer出力)")
-    print("=" * 90)
+    out("\n" + "=" * 90)
+    out("  正規化結果 (FactNormalizer出力)")
+    out("=" * 90)
 
     bs = normalized.get("current_year", {}).get("bs", {})
     for k in ["short_term_borrowings", "current_portion_of_long_term_borrowings", "long_term_borrowings",
               "short_term_lease_obligations", "long_term_lease_obligations", "lease_obligations"]:
-        print(f"  {k}: {bs.get(k)}")
+        out(f"  {k}: {bs.get(k)}")
 
     # --- 結論 ---
-    print("\n" + "=" * 90)
-    print("  結論")
-    print("=" * 90)
+    out("\n" + "=" * 90)
+    out("  結論")
+    out("=" * 90)
 
     lt = bs.get("long_term_borrowings")
     cp = bs.get("current_portion_of_long_term_borrowings")
@@ -320,12 +341,15 @@ def main() -> None:
         issues.append("  原因候補: keyword 'LeaseObligations' が 'LongTermLeaseObligations' に部分一致し、同一factを両方に割当")
 
     if issues:
-        print("\n  [問題あり]")
+        out("\n  [問題あり]")
         for i in issues:
-            print(f"  {i}")
+            out(f"  {i}")
     else:
-        print("\n  [問題なし] 同値の事象は検出されませんでした。")
-    print()
+        out("\n  [問題なし] 同値の事象は検出されませんでした。")
+    out("")
+
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
@@ -4,11 +4,15 @@ FACTレイク検証スクリプト。
 
 使用例:
     python scripts/analysis/verify_fact_lake.py
+    python scripts/analysis/verify_fact_lake.py --cache  # パイプライン結果を .cache/pipeline に再利用
 """
+import ast
 import logging
-import re
+import os
 import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
 from _pipeline import (
@@ -17,6 +21,7 @@ from _pipeline import (
     DERIVED_KEYS,
     collect_xbrl_files,
     normalize_code,
+    cached_run_pipeline,
     check_form_code,
     run_pipeline,
 )
@@ -45,14 +50,108 @@ TARGET_LABELS = {
     "3558": "ロコンド (小型)",
 }
 
+# コードベース設計検証: 条件式（if 文・条件演算子）で参照すると設計違反とみなす名前 (名前, 説明)
+CODE_CHECK_CONDITION_NAMES: list[tuple[str, str]] = [
+    ("form_code", "form_code分岐"),
+    ("industry", "業種分岐"),
+    ("bank", "銀行特別処理"),
+    ("reit", "REIT特別処理"),
+]
+# accounting_standard の == 比較を含む条件式
+CODE_CHECK_STD_EQ = ("accounting_standard", "会計基準条件分岐")
+# 文字列リテラルに含まれると設計違反とみなす様式プレフィックス (文字列, 説明)
+CODE_CHECK_LITERALS: list[tuple[str, str]] = [
+    ("jpsps", "投資法人様式参照"),
+    ("jpigp", "IFRS様式ハードコード"),
+]
+CODE_CHECK_DESCRIPTIONS = (
+    [desc for _, desc in CODE_CHECK_CONDITION_NAMES]
+    + [CODE_CHECK_STD_EQ[1]]
+    + [desc for _, desc in CODE_CHECK_LITERALS]
+)
+
 
-def process_xbrl(xbrl_path: Path) -> dict:
+class _CodeCheckVisitor(ast.NodeVisitor):
+    """条件式と文字列リテラルを走査し、検証項目ごとに該当行番号を集める。"""
+
+    def __init__(self) -> None:
+        self.hit_lines: list[set[int]] = [set() for _ in CODE_CHECK_DESCRIPTIONS]
+
+    @staticmethod
+    def _words(node: ast.AST) -> list[str]:
+        """node 配下の識別子・属性名・文字列定数を小文字で返す"""
+        words: list[str] = []
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                words.append(child.id.lower())
+            elif isinstance(child, ast.Attribute):
+                words.append(child.attr.lower())
+            elif isinstance(child, ast.Constant) and isinstance(child.value, str):
+                words.append(child.value.lower())
+        return words
+
+    def _check_condition(self, test: ast.expr) -> None:
+        words = self._words(test)
+        for i, (name, _) in enumerate(CODE_CHECK_CONDITION_NAMES):
+            if any(name in w for w in words):
+                self.hit_lines[i].add(test.lineno)
+        # == の被比較側が accounting_standard を参照するか（"accounting_standard" という
+        # 文字列そのものとの比較はキー名の判定なので対象外）
+        std_name = CODE_CHECK_STD_EQ[0]
+        for node in ast.walk(test):
+            if not isinstance(node, ast.Compare) or not any(isinstance(op, ast.Eq) for op in node.ops):
+                continue
+            operands = [node.left, *node.comparators]
+            if any(
+                not isinstance(operand, ast.Constant) and any(std_name in w for w in self._words(operand))
+                for operand in operands
+            ):
+                self.hit_lines[len(CODE_CHECK_CONDITION_NAMES)].add(test.lineno)
+                break
+
+    def visit_If(self, node: ast.If) -> None:
+        self._check_condition(node.test)
+        self.generic_visit(node)
+
+    def visit_IfExp(self, node: ast.IfExp) -> None:
+        self._check_condition(node.test)
+        self.generic_visit(node)
+
+    def visit_While(self, node: ast.While) -> None:
+        self._check_condition(node.test)
+        self.generic_visit(node)
+
+    def visit_comprehension(self, node: ast.comprehension) -> None:
+        # 内包表記のフィルタ条件（[x for x in xs if ...]）も if 文と同様に判定する
+        for cond in node.ifs:
+            self._check_condition(cond)
+        self.generic_visit(node)
+
+    def visit_Expr(self, node: ast.Expr) -> None:
+        # docstring 等の文字列式は説明文のため対象外
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            return
+        self.generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        if not isinstance(node.value, str):
+            return
+        value = node.value.lower()
+        offset = len(CODE_CHECK_CONDITION_NAMES) + 1
+        for i, (literal, _) in enumerate(CODE_CHECK_LITERALS):
+            if literal in value:
+                self.hit_lines[offset + i].add(node.lineno)
+
+
+def process_xbrl(xbrl_path: Path, use_cache: bool = False) -> dict:
     """1ファイルを処理し検証に必要な情報を返す。"""
+    pipeline = cached_run_pipeline if use_cache else run_pipeline
     try:
-        parsed, _ctx_map, _normalizer, normalized, result = run_pipeline(xbrl_path)
+        parsed, _ctx_map, _normalizer, _normalized, result = pipeline(xbrl_path)
         return {
             "xbrl_path": str(xbrl_path),
             "xbrl_filename": xbrl_path.name,
+            "form_code": check_form_code(xbrl_path.name),
             "doc_id": result.get("doc_id"),
             "security_code": normalize_code(result.get("security_code", "")),
             "security_code_raw": result.get("security_code"),
@@ -64,12 +163,29 @@ def process_xbrl(xbrl_path: Path) -> dict:
             "current_metrics": result.get("current_year", {}).get("metrics", {}),
             "prior_metrics": result.get("prior_year", {}).get("metrics", {}),
             "current_period": result.get("current_year", {}).get("period"),
-            "normalized_raw": normalized,
         }
     except Exception as e:
         return {"xbrl_path": str(xbrl_path), "error": str(e)}
 
 
+def scan_code_checks(py_file: Path) -> list[tuple[str, str]]:
+    """ソースを ast で解析し、設計上禁止の分岐・様式参照を含む行を (説明, 行) で返す。
+
+    コメントや docstring は構文木に現れないため誤検出しない。
+    結果は検証項目順 → 行順に並べる。
+    """
+    content = py_file.read_text(encoding="utf-8")
+    fname = py_file.relative_to(PROJECT_ROOT)
+    visitor = _CodeCheckVisitor()
+    visitor.visit(ast.parse(content, filename=str(py_file)))
+    lines = content.split("\n")
+    return [
+        (f"{fname}: {desc}", lines[lineno - 1].strip()[:120])
+        for desc, linenos in zip(CODE_CHECK_DESCRIPTIONS, visitor.hit_lines)
+        for lineno in sorted(linenos)
+    ]
+
+
 def analyze_null_rate(metrics: dict) -> dict:
     """NULL 率を計算する。"""
     if not metrics:
@@ -84,7 +200,7 @@ def analyze_null_rate(metrics: dict) -> dict:
     }
 
 
-def main() -> tuple[list[dict], list[dict]]:
+def main(use_cache: bool = False) -> tuple[int, list[dict]]:
     xbrl_files = collect_xbrl_files()
 
     print("=" * 80)
@@ -92,114 +208,134 @@ def main() -> tuple[list[dict], list[dict]]:
     print("=" * 80)
     print(f"\n対象XBRLファイル数: {len(xbrl_files)}")
 
-    results: list[dict] = []
+    # 1ファイルずつ集計し、ファイル単位の結果は保持しない（IFRS/JGAAPの表示用のみ残す）
+    ifrs_standards = ("IFRS", "International Financial Reporting Standards")
+    success_count = 0
     errors: list[dict] = []
-    for xf in xbrl_files:
-        r = process_xbrl(xf)
-        if "error" in r:
-            errors.append(r)
-        else:
-            results.append(r)
-
-    print(f"処理成功: {len(results)}")
-    print(f"処理失敗: {len(errors)}")
+    # 分布はファイルごとの値を並べておき、ループ後に Counter でまとめて数える
+    form_code_values: list[str] = []
+    acct_standard_values: list[str] = []
+    consol_type_values: list[str] = []
+    found_targets: set[str] = set()
+    ifrs_results: list[dict] = []
+    jgaap_results: list[dict] = []
+    jgaap_count = 0
+    null_counter: Counter = Counter()
+    total_processed = 0
+    all_metric_keys: set[str] = set()
+    # 先頭ファイルのスキーマと一致する限り frozenset を作らない（不一致時のみ集合へ追加）
+    first_keys = None
+    key_sets: set[frozenset] = set()
+
+    # ファイル単位の処理はワーカープロセスで並列実行し、集計はメインプロセスで行う
+    max_workers = os.cpu_count() or 1
+    chunksize = max(1, len(xbrl_files) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(process_xbrl, xbrl_files, repeat(use_cache), chunksize=chunksize)
+        for r in results:
+            if "error" in r:
+                errors.append(r)
+                continue
+            success_count += 1
+            acct_std = r.get("accounting_standard")
+            cm = r.get("current_metrics", {})
+
+            form_code_values.append(r["form_code"])
+            acct_standard_values.append(acct_std or "N/A")
+            consol_type_values.append(r.get("consolidation_type") or "N/A")
+            sc = r.get("security_code", "")
+            if sc in TARGET_CODES:
+                found_targets.add(sc)
+
+            if acct_std in ifrs_standards:
+                ifrs_results.append(r)
+            elif acct_std is not None:
+                jgaap_count += 1
+                if len(jgaap_results) < 5:
+                    jgaap_results.append(r)
+
+            if cm:
+                total_processed += 1
+                null_counter.update(k for k, v in cm.items() if v is None)
+            all_metric_keys.update(cm.keys())
+            all_metric_keys.update(r.get("prior_metrics", {}).keys())
+            if first_keys is None:
+                first_keys = cm.keys()
+                key_sets.add(frozenset(first_keys))
+            elif cm.keys() != first_keys:
+                key_sets.add(frozenset(cm.keys()))
+
+    form_codes = Counter(form_code_values)
+    acct_standards = Counter(acct_standard_values)
+    consol_types = Counter(consol_type_values)
+
+    lines: list[str] = []
+    out = lines.append
+
+    out(f"処理成功: {success_count}")
+    out(f"処理失敗: {len(errors)}")
 
     # === 1. 全体統計 ===
-    print(f"\n{'=' * 80}")
-    print(f"  1. 全体統計")
-    print(f"{'=' * 80}")
-
-    form_codes: Counter = Counter()
-    acct_standards: Counter = Counter()
-    consol_types: Counter = Counter()
-    found_targets: dict[str, dict] = {}
-
-    for r in results:
-        form_codes[check_form_code(r["xbrl_filename"])] += 1
-        acct_standards[r.get("accounting_standard") or "N/A"] += 1
-        consol_types[r.get("consolidation_type") or "N/A"] += 1
-        sc = r.get("security_code", "")
-        if sc in TARGET_CODES:
-            found_targets[sc] = r
-
-    print("\n--- 様式コード分布 ---")
+    out(f"\n{'=' * 80}")
+    out(f"  1. 全体統計")
+    out(f"{'=' * 80}")
+
+    out("\n--- 様式コード分布 ---")
     for fc, cnt in form_codes.most_common():
-        print(f"  {fc}: {cnt} 件")
-    print("\n--- 会計基準分布 ---")
+        out(f"  {fc}: {cnt} 件")
+    out("\n--- 会計基準分布 ---")
     for std, cnt in acct_standards.most_common():
-        print(f"  {std}: {cnt} 件")
-    print("\n--- 連結区分分布 ---")
+        out(f"  {std}: {cnt} 件")
+    out("\n--- 連結区分分布 ---")
     for ct, cnt in consol_types.most_common():
-        print(f"  {ct}: {cnt} 件")
-    print("\n--- 対象銘柄の存在確認 ---")
+        out(f"  {ct}: {cnt} 件")
+    out("\n--- 対象銘柄の存在確認 ---")
     for code in sorted(TARGET_CODES):
         status = "FOUND" if code in found_targets else "NOT FOUND"
-        print(f"  {code} {TARGET_LABELS.get(code, '')}: [{status}]")
+        out(f"  {code} {TARGET_LABELS.get(code, '')}: [{status}]")
 
     # === 2. IFRS企業検証 ===
-    ifrs_results = [
-        r for r in results
-        if r.get("accounting_standard") in ("IFRS", "International Financial Reporting Standards")
-    ]
-    print(f"\n{'=' * 80}")
-    print(f"  2. IFRS企業検証 ({len(ifrs_results)} 件)")
-    print(f"{'=' * 80}")
+    out(f"\n{'=' * 80}")
+    out(f"  2. IFRS企業検証 ({len(ifrs_results)} 件)")
+    out(f"{'=' * 80}")
     for r in ifrs_results:
         cm = r.get("current_metrics", {})
         null_info = analyze_null_rate(cm)
-        print(f"\n--- {r['security_code']} (doc_id: {r['doc_id']}) ---")
-        print(f"  accounting_standard: {r['accounting_standard']}")
-        print(f"  taxonomy_version: {r.get('taxonomy_version')}")
-        print(f"  form_code: {check_form_code(r['xbrl_filename'])}")
-        print(f"  consolidation_type: {r['consolidation_type']}")
-        print(f"  canonical_fact件数: {null_info.get('total_keys', 0)}")
-        print(f"  NULL率: {null_info.get('null_rate', 0):.1%}")
-        print(f"  ordinary_income: {cm.get('ordinary_income')} (IFRS -> null expected)")
+        out(f"\n--- {r['security_code']} (doc_id: {r['doc_id']}) ---")
+        out(f"  accounting_standard: {r['accounting_standard']}")
+        out(f"  taxonomy_version: {r.get('taxonomy_version')}")
+        out(f"  form_code: {r['form_code']}")
+        out(f"  consolidation_type: {r['consolidation_type']}")
+        out(f"  canonical_fact件数: {null_info.get('total_keys', 0)}")
+        out(f"  NULL率: {null_info.get('null_rate', 0):.1%}")
+        out(f"  ordinary_income: {cm.get('ordinary_income')} (IFRS -> null expected)")
 
     # === 3. JGAAP企業サンプル検証 ===
-    jgaap_results = [
-        r for r in results
-        if r.get("accounting_standard") not in ("IFRS", "International Financial Reporting Standards", None)
-    ]
-    print(f"\n{'=' * 80}")
-    print(f"  3. JGAAP企業検証 ({len(jgaap_results)} 件)")
-    print(f"{'=' * 80}")
-    for r in jgaap_results[:5]:
+    out(f"\n{'=' * 80}")
+    out(f"  3. JGAAP企業検証 ({jgaap_count} 件)")
+    out(f"{'=' * 80}")
+    for r in jgaap_results:
         cm = r.get("current_metrics", {})
         null_info = analyze_null_rate(cm)
-        print(f"\n--- {r['security_code']} (doc_id: {r['doc_id']}) ---")
-        print(f"  accounting_standard: {r['accounting_standard']}")
-        print(f"  NULL率: {null_info.get('null_rate', 0):.1%}")
+        out(f"\n--- {r['security_code']} (doc_id: {r['doc_id']}) ---")
+        out(f"  accounting_standard: {r['accounting_standard']}")
+        out(f"  NULL率: {null_info.get('null_rate', 0):.1%}")
 
     # === 4. NULL率全体分析 ===
-    print(f"\n{'=' * 80}")
-    print(f"  4. NULL率全体分析")
-    print(f"{'=' * 80}")
-    null_counter: Counter = Counter()
-    total_processed = 0
-    for r in results:
-        cm = r.get("current_metrics", {})
-        if cm:
-            total_processed += 1
-            for k, v in cm.items():
-                if v is None:
-                    null_counter[k] += 1
-    print(f"\n全{total_processed}件中のNULL率上位:")
+    out(f"\n{'=' * 80}")
+    out(f"  4. NULL率全体分析")
+    out(f"{'=' * 80}")
+    out(f"\n全{total_processed}件中のNULL率上位:")
     for key, cnt in null_counter.most_common(15):
         rate = cnt / total_processed if total_processed > 0 else 0
-        print(f"  {key}: {cnt}/{total_processed} ({rate:.1%})")
+        out(f"  {key}: {cnt}/{total_processed} ({rate:.1%})")
 
     # === 5. 設計整合性チェック ===
-    print(f"\n{'=' * 80}")
-    print(f"  5. 設計整合性チェック")
-    print(f"{'=' * 80}")
+    out(f"\n{'=' * 80}")
+    out(f"  5. 設計整合性チェック")
+    out(f"{'=' * 80}")
     checks: list[tuple[str, bool, str]] = []
 
-    all_metric_keys: set[str] = set()
-    for r in results:
-        all_metric_keys.update(r.get("current_metrics", {}).keys())
-        all_metric_keys.update(r.get("prior_metrics", {}).keys())
-
     leaked_derived = all_metric_keys & DERIVED_KEYS
     checks.append(("Derived指標が混入していない", len(leaked_derived) == 0,
                     f"混入: {leaked_derived}" if leaked_derived else ""))
@@ -218,61 +354,48 @@ def main() -> tuple[list[dict], list[dict]]:
         f"{len(ifrs_ordinary_companies)}/{len(ifrs_results)}件に値あり" if ifrs_ordinary_companies else "",
     ))
 
-    key_sets = {frozenset(r.get("current_metrics", {}).keys()) for r in results}
     checks.append(("全企業が同一スキーマ", len(key_sets) <= 1,
                     f"異なるスキーマ数: {len(key_sets)}" if len(key_sets) > 1 else ""))
 
     for name, ok, detail in checks:
-        print(f"  {'[OK]' if ok else '[NG]'} {name}")
+        out(f"  {'[OK]' if ok else '[NG]'} {name}")
         if detail:
-            print(f"        {detail}")
+            out(f"        {detail}")
 
     # === 6. コードベース設計検証 ===
-    print(f"\n{'=' * 80}")
-    print(f"  6. コードベース設計検証（様式/業種/会計基準依存の有無）")
-    print(f"{'=' * 80}")
+    out(f"\n{'=' * 80}")
+    out(f"  6. コードベース設計検証（様式/業種/会計基準依存の有無）")
+    out(f"{'=' * 80}")
     src_dir = PROJECT_ROOT / "src"
     code_checks: list[tuple[str, str]] = []
     for py_file in src_dir.rglob("*.py"):
-        content = py_file.read_text(encoding="utf-8")
-        fname = py_file.relative_to(PROJECT_ROOT)
-        for pattern, desc in [
-            ("if.*form_code", "form_code分岐"),
-            ("if.*industry", "業種分岐"),
-            ("if.*bank", "銀行特別処理"),
-            ("if.*reit", "REIT特別処理"),
-            ("if.*accounting_standard.*==", "会計基準条件分岐"),
-            ("jpsps", "投資法人様式参照"),
-            ("jpigp", "IFRS様式ハードコード"),
-        ]:
-            for m in re.findall(f".*{pattern}.*", content, re.IGNORECASE):
-                stripped = m.strip()
-                if not stripped.startswith("#") and not stripped.startswith('"""'):
-                    code_checks.append((f"{fname}: {desc}", stripped[:120]))
+        code_checks.extend(scan_code_checks(py_file))
     if not code_checks:
         for label in ["様式依存分岐", "業種依存分岐", "会計基準条件分岐", "REIT特別処理", "銀行特別処理"]:
-            print(f"  [OK] {label}なし")
+            out(f"  [OK] {label}なし")
     else:
         for desc, line in code_checks:
-            print(f"  [WARN] {desc}\n         {line}")
+            out(f"  [WARN] {desc}\n         {line}")
 
     # === エラー一覧 ===
     if errors:
-        print(f"\n{'=' * 80}")
-        print(f"  7. 処理エラー ({len(errors)} 件)")
-        print(f"{'=' * 80}")
+        out(f"\n{'=' * 80}")
+        out(f"  7. 処理エラー ({len(errors)} 件)")
+        out(f"{'=' * 80}")
         for e in errors[:10]:
-            print(f"  {Path(e['xbrl_path']).name}: {e['error'][:100]}")
+            out(f"  {Path(e['xbrl_path']).name}: {e['error'][:100]}")
 
     # === 最終判定 ===
-    print(f"\n{'=' * 80}")
-    print(f"  最終判定")
-    print(f"{'=' * 80}")
+    out(f"\n{'=' * 80}")
+    out(f"  最終判定")
+    out(f"{'=' * 80}")
     all_ok = all(ok for _, ok, _ in checks) and len(code_checks) == 0
-    print(f"  {'[PASS] 設計整合性に問題なし' if all_ok else '[WARN] 一部検証項目に注意事項あり'}")
-    print()
-    return results, errors
+    out(f"  {'[PASS] 設計整合性に問題なし' if all_ok else '[WARN] 一部検証項目に注意事項あり'}")
+    out("")
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+    return success_count, errors
 
 
 if __name__ == "__main__":
-    main()
+    main(use_cache="--cache" in sys.argv[1:])
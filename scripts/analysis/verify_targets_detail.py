@@ -4,9 +4,14 @@
 
 使用例:
     python scripts/analysis/verify_targets_detail.py
+    python scripts/analysis/verify_targets_detail.py --cache  # パイプライン結果を .cache/pipeline に再利用
 """
 import logging
+import os
 import sys
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
 from _pipeline import (
@@ -14,7 +19,9 @@ from _pipeline import (
     FACT_KEYS,
     collect_xbrl_files,
     normalize_code,
+    cached_run_pipeline,
     check_form_code,
+    peek_security_codes,
     run_pipeline,
 )
 
@@ -36,10 +43,11 @@ TARGET_LABELS = {
 }
 
 
-def process_xbrl(xbrl_path: Path) -> dict:
+def process_xbrl(xbrl_path: Path, use_cache: bool = False) -> dict:
     """1ファイルを処理し詳細検証に必要な情報を返す。"""
+    pipeline = cached_run_pipeline if use_cache else run_pipeline
     try:
-        parsed, _ctx_map, _normalizer, _normalized, result = run_pipeline(xbrl_path)
+        parsed, _ctx_map, _normalizer, _normalized, result = pipeline(xbrl_path)
         return {
             "xbrl_path": str(xbrl_path),
             "xbrl_filename": xbrl_path.name,
@@ -58,94 +66,116 @@ def process_xbrl(xbrl_path: Path) -> dict:
         return {"xbrl_path": str(xbrl_path), "error": str(e)}
 
 
-def _print_company_report(r: dict, index: int) -> None:
+def _process_target(xbrl_path: Path, target_codes: frozenset[str], use_cache: bool) -> dict | None:
+    """対象銘柄のファイルのみ処理する。
+
+    DEI の証券コードが対象外のファイルはパイプラインを実行せず None を返す（判定不能時は実行する）。
+    """
+    codes = peek_security_codes(xbrl_path)
+    if codes is not None and codes.isdisjoint(target_codes):
+        return None
+    return process_xbrl(xbrl_path, use_cache)
+
+
+def _print_company_report(r: dict, index: int, out: Callable[[str], None]) -> None:
     sc = r["security_code"]
     label = TARGET_LABELS.get(sc, sc)
     cm = r.get("current_metrics", {})
 
-    print(f"\n{'='*70}")
-    print(f"  [{index}] {sc} - {label}")
-    print(f"{'='*70}")
-    print(f"\n  1. report_form_code: {check_form_code(r['xbrl_filename'])}")
-    print(f"  2. accounting_standard: {r['accounting_standard']}")
-    print(f"  3. taxonomy_version: {r.get('taxonomy_version')}")
-    print(f"  4. canonical_fact件数: {len(cm)}")
+    out(f"\n{'='*70}")
+    out(f"  [{index}] {sc} - {label}")
+    out(f"{'='*70}")
+    out(f"\n  1. report_form_code: {check_form_code(r['xbrl_filename'])}")
+    out(f"  2. accounting_standard: {r['accounting_standard']}")
+    out(f"  3. taxonomy_version: {r.get('taxonomy_version')}")
+    out(f"  4. canonical_fact件数: {len(cm)}")
 
     null_items = {k: v for k, v in cm.items() if v is None}
     non_null = {k: v for k, v in cm.items() if v is not None}
     null_rate = len(null_items) / len(cm) if cm else 0
 
-    print(f"\n  5. NULL率上位10項目: ({len(null_items)}/{len(cm)} = {null_rate:.1%})")
+    out(f"\n  5. NULL率上位10項目: ({len(null_items)}/{len(cm)} = {null_rate:.1%})")
     for k in sorted(null_items.keys()):
-        print(f"     - {k}: NULL")
+        out(f"     - {k}: NULL")
 
-    print(f"\n  6. 取得成功項目:")
+    out(f"\n  6. 取得成功項目:")
     for k in sorted(non_null.keys()):
         v = non_null[k]
         if isinstance(v, float) and v >= 1000:
-            print(f"     - {k}: {v:,.0f}")
+            out(f"     - {k}: {v:,.0f}")
         else:
-            print(f"     - {k}: {v}")
+            out(f"     - {k}: {v}")
 
-    print(f"\n  7. 構造上の問題有無:")
+    out(f"\n  7. 構造上の問題有無:")
     issues: list[str] = []
     if set(cm.keys()) != FACT_KEYS:
         issues.append(f"スキーマ不一致: got={sorted(cm.keys())}, expected={sorted(FACT_KEYS)}")
     if r["accounting_standard"] == "IFRS" and cm.get("ordinary_income") is not None:
         issues.append("IFRS企業にordinary_income値あり（連結コンテキスト由来 → 企業開示による正常動作）")
     if not issues:
-        print("     なし")
+        out("     なし")
     else:
         for iss in issues:
-            print(f"     [INFO] {iss}")
+            out(f"     [INFO] {iss}")
 
-    print(f"\n  8. consolidation_type: {r['consolidation_type']}")
-    print(f"     fiscal_year_end: {r['fiscal_year_end']}")
+    out(f"\n  8. consolidation_type: {r['consolidation_type']}")
+    out(f"     fiscal_year_end: {r['fiscal_year_end']}")
     if r.get("current_period"):
-        print(f"     current_period: {r['current_period']}")
+        out(f"     current_period: {r['current_period']}")
 
 
-def main() -> None:
+def main(use_cache: bool = False) -> None:
     xbrl_files = collect_xbrl_files()
-    target_codes = set(TARGET_LABELS.keys())
+    target_codes = frozenset(TARGET_LABELS.keys())
     found: dict[str, list[dict]] = {}
 
-    for xf in xbrl_files:
-        r = process_xbrl(xf)
-        if "error" in r:
-            continue
-        sc = r.get("security_code", "")
-        if sc in target_codes:
-            found.setdefault(sc, []).append(r)
-
-    print("=" * 70)
-    print("  FACTレイク追加パターン検証 - 詳細レポート")
-    print("=" * 70)
+    max_workers = os.cpu_count() or 1
+    chunksize = max(1, len(xbrl_files) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            _process_target, xbrl_files, repeat(target_codes), repeat(use_cache), chunksize=chunksize,
+        )
+        for r in results:
+            if r is None or "error" in r:
+                continue
+            sc = r.get("security_code", "")
+            if sc in target_codes:
+                found.setdefault(sc, []).append(r)
+
+    lines: list[str] = []
+    out = lines.append
+
+    out("=" * 70)
+    out("  FACTレイク追加パターン検証 - 詳細レポート")
+    out("=" * 70)
 
     idx = 1
     for sc in sorted(TARGET_LABELS.keys()):
         if sc in found:
             for r in found[sc]:
-                _print_company_report(r, idx)
+                _print_company_report(r, idx, out)
                 idx += 1
         else:
             label = TARGET_LABELS.get(sc, sc)
-            print(f"\n{'='*70}")
-            print(f"  [{idx}] {sc} - {label}")
-            print(f"{'='*70}")
-            print("  [NOT AVAILABLE] XBRLデータが取得範囲に含まれていません")
+            out(f"\n{'='*70}")
+            out(f"  [{idx}] {sc} - {label}")
+            out(f"{'='*70}")
+            out("  [NOT AVAILABLE] XBRLデータが取得範囲に含まれていません")
             idx += 1
 
-    print(f"\n{'='*70}")
-    print("  サマリー")
-    print(f"{'='*70}")
+    out(f"\n{'='*70}")
+    out("  サマリー")
+    out(f"{'='*70}")
     found_count = sum(len(v) for v in found.values())
-    print(f"  検証済み銘柄: {len(found)}/{len(TARGET_LABELS)}")
-    print(f"  検証済みドキュメント数: {found_count}")
+    out(f"  検証済み銘柄: {len(found)}/{len(TARGET_LABELS)}")
+    out(f"  検証済みドキュメント数: {found_count}")
     missing = target_codes - set(found.keys())
     if missing:
-        print(f"  未検証銘柄: {', '.join(sorted(missing))}")
+        out(f"  未検証銘柄: {', '.join(sorted(missing))}")
+
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
-    main()
+    main(use_cache="--cache" in sys.argv[1:])
@@ -4,17 +4,27 @@ XBRLファイルをパースしてJSON出力まで実行する。
 
 使用例:
     python scripts/process_all.py
+    python scripts/process_all.py --incremental  # 前回実行から変更のないXBRLは再処理しない
 """
+import hashlib
+import json
 import logging
+import mmap
+import multiprocessing
 import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 from dotenv import load_dotenv
 
 project_root = Path(__file__).resolve().parent.parent
-sys.path.insert(0, str(project_root))
-sys.path.insert(0, str(project_root / "src"))
+# spawn されたワーカーでも本モジュールは再実行されるため、既に含まれるパスは重複追加しない
+for _path in (str(project_root), str(project_root / "src")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 
 env_path = project_root / ".env"
 if env_path.exists():
@@ -24,79 +34,252 @@ if "DATASET_PATH" not in os.environ:
     sys.stderr.write("ERROR: DATASET_PATH 環境変数が設定されていません。\n")
     sys.exit(1)
 
-from parser.xbrl_parser import XBRLParser
-from parser.context_resolver import ContextResolver
-from normalizer.fact_normalizer import FactNormalizer
-from financial.financial_master import FinancialMaster
-from output.json_exporter import JSONExporter
-from constants import SKIP_FILENAME_PATTERNS
-
+# 既定は INFO。ファイル単位の処理経過まで見る場合は LOGLEVEL=DEBUG を指定する
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOGLEVEL", "INFO").upper(),
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 logger = logging.getLogger(__name__)
 
+# ワーカー1プロセスあたりの最大処理件数。超えたら新しいプロセスに置き換え、
+# 長時間のバッチでワーカーのメモリが膨らみ続けないようにする
+MAX_TASKS_PER_CHILD = 50
+
+# --incremental 用の処理済みファイル記録（XBRLパス -> [mtime_ns, size, 出力JSONパス]）
+STATE_PATH = project_root / ".cache" / "process_all" / "state.json"
+
+# ワーカープロセスごとに1つだけ生成する JSONExporter（_init_worker で設定）
+_exporter = None
+# security_code の DEI タグ名（バイト列、_init_worker で設定）
+_security_code_tags: tuple[bytes, ...] = ()
+
+
+def _init_worker(log_queue: multiprocessing.Queue) -> None:
+    """ワーカープロセス起動時に1回だけ呼ばれ、ログ出力先の差し替えと JSONExporter の生成を行う。
+
+    ワーカーのログはキュー経由でメインプロセスの QueueListener にまとめ、
+    複数プロセスから stderr へ直接書き込んで行が混ざらないようにする。
+    """
+    global _exporter, _security_code_tags
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [QueueHandler(log_queue)]
+    from output.json_exporter import JSONExporter
+    from src.config_loader import load_taxonomy_mapping
+
+    # manifest は main() で全件出力後に1回だけ生成する
+    _exporter = JSONExporter(update_manifest=False)
+    _security_code_tags = tuple(
+        tag.encode("utf-8") for tag, key in load_taxonomy_mapping()["dei"] if key == "security_code"
+    )
+
+
+def _pipeline_fingerprint() -> str:
+    """出力に影響する設定・コード（config/*.yaml, src/**/*.py）と出力先のハッシュを返す。"""
+    h = hashlib.sha256(os.environ["DATASET_PATH"].encode("utf-8"))
+    for path in sorted([*(project_root / "config").glob("*.yaml"), *(project_root / "src").rglob("*.py")]):
+        h.update(str(path.relative_to(project_root)).encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def _load_state(fingerprint: str) -> dict[str, list]:
+    """前回の処理済み記録を返す。設定・コード・出力先が変わっていれば空とする。"""
+    try:
+        state = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if state.get("fingerprint") != fingerprint:
+        return {}
+    return state.get("files", {})
+
+
+def _save_state(fingerprint: str, files: dict[str, list]) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = STATE_PATH.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({"fingerprint": fingerprint, "files": files}), encoding="utf-8")
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _lacks_tag(path: str, needles: tuple[bytes, ...]) -> bool:
+    """ファイル本体にいずれの needle も含まれないことが確実な場合のみ True を返す。
+
+    XMLとしては解釈せず mmap 上のバイト列検索だけで判定する（読めない・空のファイルは False）。
+    needles が空（設定に該当タグがない）場合は判定できないため False とし、通常のパースに任せる。
+    """
+    if not needles:
+        return False
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return all(mm.find(needle) < 0 for needle in needles)
+    except (OSError, ValueError):
+        return False
+
+
+def _doc_id(xbrl_path: str) -> str:
+    """XBRLパスから doc_id（EDINET 書類管理番号 = 親ディレクトリ名）を返す。"""
+    return os.path.basename(os.path.dirname(xbrl_path))
+
 
-def main() -> None:
+def _process_one(xbrl_path: Path) -> str | None:
+    """1ファイルをパース〜JSON出力まで処理し、保存パスを返す（スキップ・失敗時は None）。
+
+    ワーカープロセスで実行される。出力ファイルは銘柄・決算期ごとに独立している。
+    """
+    # パイプライン各層（lxml / YAML 設定の読み込みを伴う）は処理対象がある場合のみ読み込む
+    from parser.xbrl_parser import XBRLParser
+    from parser.context_resolver import ContextResolver
+    from normalizer.fact_normalizer import FactNormalizer
+    from financial.financial_master import FinancialMaster
+
+    try:
+        # security_code の DEI タグを1つも含まないファイルは、パースしても必須項目欠損で
+        # スキップされるため、バイト列検索だけで除外する
+        if _lacks_tag(str(xbrl_path), _security_code_tags):
+            logger.debug("SKIP: %s (security_code タグなし)", xbrl_path.name)
+            return None
+
+        logger.debug("Processing: %s", xbrl_path.name)
+
+        parser = XBRLParser(xbrl_path)
+        parsed_data = parser.parse()
+        resolver = ContextResolver(parser.root)
+        context_map = resolver.build_context_map()
+        normalizer = FactNormalizer(parsed_data, context_map)
+        normalized_data = normalizer.normalize()
+
+        security_code = normalized_data.get("security_code")
+        fiscal_year_end = normalized_data.get("fiscal_year_end")
+        if security_code is None or fiscal_year_end is None:
+            logger.debug(
+                "SKIP: 必須項目欠損 (security_code=%s, fiscal_year_end=%s)",
+                security_code, fiscal_year_end,
+            )
+            return None
+
+        master = FinancialMaster(normalized_data)
+        financial_data = master.compute()
+
+        json_path = _exporter.export(financial_data)
+        logger.info("Saved: %s", json_path)
+        return json_path
+
+    except ValueError as e:
+        error_msg = str(e).lower()
+        if any(kw in error_msg for kw in ("security_code", "fiscal_year_end", "data_version", "unknown")):
+            logger.debug("SKIP: %s - %s", xbrl_path.name, e)
+            return None
+        logger.error("Failed: %s - %s", xbrl_path.name, e)
+    except Exception as e:
+        logger.error("Failed: %s - %s", xbrl_path.name, e, exc_info=True)
+    return None
+
+
+def main(incremental: bool = False) -> None:
     xbrl_base_dir = project_root / "data" / "edinet" / "raw_xbrl"
 
     if not xbrl_base_dir.exists():
         logger.warning("XBRLディレクトリが存在しません: %s", xbrl_base_dir)
         return
 
-    xbrl_files = list(xbrl_base_dir.rglob("*.xbrl"))
     logger.info("XBRL検索ディレクトリ: %s", xbrl_base_dir)
-    logger.info("XBRL ファイル数: %d", len(xbrl_files))
 
-    if not xbrl_files:
-        logger.warning("XBRLファイルが見つかりません: %s", xbrl_base_dir)
-        return
+    from constants import SKIP_FILENAME_PATTERNS
+    from utils import scandir_xbrl
 
-    for xbrl_path in xbrl_files:
-        try:
-            name_lower = xbrl_path.name.lower()
-            if any(pattern in name_lower for pattern in SKIP_FILENAME_PATTERNS):
-                logger.debug("SKIP: %s (処理対象外)", xbrl_path.name)
-                continue
-
-            logger.info("Processing: %s", xbrl_path.name)
-
-            parser = XBRLParser(xbrl_path)
-            parsed_data = parser.parse()
-            resolver = ContextResolver(parser.root)
-            context_map = resolver.build_context_map()
-            normalizer = FactNormalizer(parsed_data, context_map)
-            normalized_data = normalizer.normalize()
-
-            security_code = normalized_data.get("security_code")
-            fiscal_year_end = normalized_data.get("fiscal_year_end")
-            if security_code is None or fiscal_year_end is None:
-                logger.debug(
-                    "SKIP: 必須項目欠損 (security_code=%s, fiscal_year_end=%s)",
-                    security_code, fiscal_year_end,
+    # 処理対象外パターンを1つの正規表現にまとめ、ファイル名1回の走査で判定する
+    skip_re = re.compile("|".join(map(re.escape, SKIP_FILENAME_PATTERNS)), re.IGNORECASE)
+
+    # --incremental 時は、前回出力済みで mtime・サイズが変わっていないファイルを再処理しない
+    fingerprint = _pipeline_fingerprint() if incremental else ""
+    prev_state = _load_state(fingerprint) if incremental else {}
+    state: dict[str, list] = {}
+    unchanged = 0
+    # 出力JSONパス -> その出力を書いた（前回書いた）XBRLパス。重複出力の解決に使う
+    writers: dict[str, list[str]] = {}
+
+    # 走査しながら対象ファイルを順次ワーカーへ投入し、ディレクトリ走査と処理を重ねる。
+    # 処理対象外のファイルは走査（src/utils.scandir_xbrl）の時点で除外する
+    file_count = 0
+    saved = 0
+    # max_tasks_per_child 指定時のワーカーは spawn で起動されるため、キューも同じコンテキストで生成する
+    mp_context = multiprocessing.get_context("spawn")
+    log_queue = mp_context.Queue()
+    listener = QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1, max_tasks_per_child=MAX_TASKS_PER_CHILD,
+            mp_context=mp_context, initializer=_init_worker, initargs=(log_queue,),
+        ) as executor:
+            futures = {}
+            for path in scandir_xbrl(str(xbrl_base_dir), skip_re):
+                file_count += 1
+                name = os.path.basename(path)
+                stat_key = None
+                if incremental:
+                    st = os.stat(path)
+                    stat_key = [st.st_mtime_ns, st.st_size]
+                    prev = prev_state.get(path)
+                    if prev and prev[:2] == stat_key and os.path.exists(prev[2]):
+                        logger.debug("SKIP: %s (前回から変更なし)", name)
+                        state[path] = prev
+                        writers.setdefault(prev[2], []).append(path)
+                        unchanged += 1
+                        continue
+                futures[executor.submit(_process_one, Path(path))] = (path, stat_key)
+            logger.info("処理対象 XBRL ファイル数: %d", file_count)
+            if incremental:
+                logger.info("前回から変更なしのためスキップ: %d", unchanged)
+
+            if not file_count:
+                logger.warning("XBRLファイルが見つかりません: %s", xbrl_base_dir)
+                return
+
+            for future in as_completed(futures):
+                json_path = future.result()
+                if json_path is not None:
+                    saved += 1
+                    path, stat_key = futures[future]
+                    writers.setdefault(json_path, []).append(path)
+                    if incremental:
+                        state[path] = [*stat_key, json_path]
+
+            # 訂正報告書など複数の提出書類が同じ出力ファイル（銘柄・決算期）に対応する場合、
+            # 並列実行では完了順で勝者が変わるため、doc_id が最も新しい（大きい）書類を採用して
+            # 全件完了後にその1件だけ書き直す
+            rewrite: list[Path] = []
+            for json_path, paths in writers.items():
+                if len(paths) < 2:
+                    continue
+                winner = max(paths, key=lambda p: (_doc_id(p), p))
+                logger.warning(
+                    "出力先が重複しています: %s <- %s（%s を採用）",
+                    json_path, ", ".join(sorted(map(_doc_id, paths))), _doc_id(winner),
                 )
-                continue
+                rewrite.append(Path(winner))
+            for xbrl_path, json_path in zip(rewrite, executor.map(_process_one, rewrite)):
+                if json_path is None:
+                    logger.error("重複出力の書き直しに失敗しました: %s", xbrl_path)
+    finally:
+        # ワーカー終了後に残りのログを書き出してから停止する
+        listener.stop()
 
-            master = FinancialMaster(normalized_data)
-            financial_data = master.compute()
+    if incremental:
+        _save_state(fingerprint, state)
 
-            exporter = JSONExporter()
-            json_path = exporter.export(financial_data)
-            logger.info("Saved: %s", json_path)
+    # manifest は export ごとには更新せず、全件出力後に最終状態で1回だけ生成する
+    if saved:
+        from output.manifest_generator import DatasetManifestGenerator
 
-        except ValueError as e:
-            error_msg = str(e).lower()
-            if any(kw in error_msg for kw in ("security_code", "fiscal_year_end", "data_version", "unknown")):
-                logger.debug("SKIP: %s - %s", xbrl_path.name, e)
-                continue
-            logger.error("Failed: %s - %s", xbrl_path.name, e)
+        try:
+            manifest_path = DatasetManifestGenerator().save()
+            logger.info("Dataset manifest generated: %s", manifest_path)
         except Exception as e:
-            logger.error("Failed: %s - %s", xbrl_path.name, e, exc_info=True)
+            logger.warning("Failed to generate dataset manifest: %s", e)
 
     logger.info("Processing completed")
 
 
 if __name__ == "__main__":
-    main()
+    main(incremental="--incremental" in sys.argv[1:])
@@ -10,13 +10,14 @@ import sys
 from pathlib import Path
 
 project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "src"))
 
 from parser.xbrl_parser import XBRLParser
 from parser.context_resolver import ContextResolver
 from normalizer.fact_normalizer import FactNormalizer
 from financial.financial_master import FinancialMaster
-from config_loader import get_fact_keys, get_derived_keys
+from src.config_loader import get_fact_keys, get_derived_keys
 
 FACT_KEYS = get_fact_keys()
 DERIVED_KEYS = get_derived_keys()
@@ -105,10 +105,13 @@ if __name__ == "__main__":
     if not is_quarterly_dict:
         print(f"[NG] record_counts.quarterly の型が不正: {type(quarterly_counts)}")
 
+    # latest / 降順ソートの検証で共用する降順リスト（ソートは1回だけ）
+    sorted_annual = sorted(annual_periods or [], reverse=True)
+    sorted_quarterly = sorted(quarterly_periods or [], reverse=True)
+
     # latest_annual の検証
     if annual_periods:
         latest_annual = manifest.get("latest_annual")
-        sorted_annual = sorted(annual_periods, reverse=True)
         checks.append(
             (
                 "latest_annual が正しい",
@@ -121,7 +124,6 @@ if __name__ == "__main__":
     # latest_quarterly の検証
     if quarterly_periods:
         latest_quarterly = manifest.get("latest_quarterly")
-        sorted_quarterly = sorted(quarterly_periods, reverse=True)
         checks.append(
             (
                 "latest_quarterly が正しい",
@@ -133,11 +135,11 @@ if __name__ == "__main__":
 
     # 降順ソート確認
     if len(annual_periods) > 1:
-        is_sorted_desc = annual_periods == sorted(annual_periods, reverse=True)
+        is_sorted_desc = annual_periods == sorted_annual
         checks.append(("annual_periods が降順ソート", is_sorted_desc))
 
     if len(quarterly_periods) > 1:
-        is_sorted_desc = quarterly_periods == sorted(quarterly_periods, reverse=True)
+        is_sorted_desc = quarterly_periods == sorted_quarterly
         checks.append(("quarterly_periods が降順ソート", is_sorted_desc))
 
     print("\n--- 検証結果 ---")
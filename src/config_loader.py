@@ -4,8 +4,11 @@ config/ ディレクトリの YAML をロードし、アプリケーション全
 ハードコードされたタグリストや定数を排除し、YAML 駆動のアーキテクチャを実現する。
 """
 import logging
+import sys
+from collections.abc import Mapping
 from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 from typing import Any
 
 import yaml
@@ -14,6 +17,9 @@ logger = logging.getLogger(__name__)
 
 _CONFIG_DIR = Path(__file__).resolve().parent.parent / "config"
 
+# libyaml（C実装）付きの PyYAML であれば C ローダーを使う。結果は SafeLoader と同じ
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def _load_yaml(filename: str) -> dict[str, Any]:
     """config/ 配下の YAML ファイルをロードする。"""
@@ -21,7 +27,7 @@ def _load_yaml(filename: str) -> dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f"設定ファイルが見つかりません: {path}")
     with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=_YAML_LOADER)
     if not isinstance(data, dict):
         raise ValueError(f"設定ファイルの形式が不正です: {path}")
     return data
@@ -40,6 +46,7 @@ def load_taxonomy_mapping() -> dict[str, list[tuple[str, str]]]:
             "dividend": [(tag, key), ...],
             "dei": [(tag, key), ...],
         }
+        tag / key は intern 済み（canonical キーとの辞書照合用）。
     """
     raw = _load_yaml("taxonomy_mapping.yaml")
     result: dict[str, list[tuple[str, str]]] = {}
@@ -50,7 +57,7 @@ def load_taxonomy_mapping() -> dict[str, list[tuple[str, str]]]:
             tag = entry.get("tag", "")
             key = entry.get("key", "")
             if tag and key:
-                tag_list.append((tag, key))
+                tag_list.append((sys.intern(tag), sys.intern(key)))
         result[category] = tag_list
         logger.debug("taxonomy_mapping: %s -> %d entries", category, len(tag_list))
     return result
@@ -67,11 +74,41 @@ def load_canonical_keys() -> dict[str, Any]:
     return _load_yaml("canonical_keys.yaml")
 
 
+@lru_cache(maxsize=1)
+def _build_fact_key_tables() -> tuple[
+    tuple[str, ...], Mapping[str, tuple[str, ...]], Mapping[str, str]
+]:
+    """
+    canonical_keys.yaml の fact_keys を1回だけ走査し、定義順のキー一覧・
+    優先順位解決ルール・normalizer キーマッピングをまとめて構築する。
+    キー文字列は intern し、taxonomy_mapping 由来の normalizer 出力キーとの
+    辞書照合が同一オブジェクト比較で済むようにする。
+    """
+    config = load_canonical_keys()
+    order: list[str] = []
+    rules: dict[str, tuple[str, ...]] = {}
+    mapping: dict[str, str] = {}
+    for key, props in config.get("fact_keys", {}).items():
+        key = sys.intern(key)
+        order.append(key)
+        if not isinstance(props, dict):
+            continue
+        if "resolution" in props:
+            rules[key] = tuple(sys.intern(k) for k in props["resolution"])
+        if "normalizer_key" in props:
+            mapping[sys.intern(props["normalizer_key"])] = key
+    return tuple(order), MappingProxyType(rules), MappingProxyType(mapping)
+
+
 @lru_cache(maxsize=1)
 def get_fact_keys() -> frozenset[str]:
     """financial-dataset に保存する Fact キーの集合を返す。"""
-    config = load_canonical_keys()
-    return frozenset(config.get("fact_keys", {}).keys())
+    return frozenset(get_fact_key_order())
+
+
+def get_fact_key_order() -> tuple[str, ...]:
+    """Fact キーを canonical_keys.yaml の定義順で返す（出力順を固定したい処理用）。"""
+    return _build_fact_key_tables()[0]
 
 
 @lru_cache(maxsize=1)
@@ -81,44 +118,33 @@ def get_derived_keys() -> frozenset[str]:
     return frozenset(config.get("derived_keys", []))
 
 
-@lru_cache(maxsize=1)
-def get_resolution_rules() -> dict[str, list[str]]:
+def get_resolution_rules() -> Mapping[str, tuple[str, ...]]:
     """
     同一概念の優先順位解決ルールを返す。
+    キャッシュを共有するため、読み取り専用のマッピングとして返す。
 
     Returns:
-        {"equity": ["shareholders_equity", "equity_attributable_to_owners", ...], ...}
+        {"equity": ("shareholders_equity", "equity_attributable_to_owners", ...), ...}
     """
-    config = load_canonical_keys()
-    rules: dict[str, list[str]] = {}
-    for key, props in config.get("fact_keys", {}).items():
-        if isinstance(props, dict) and "resolution" in props:
-            rules[key] = props["resolution"]
-    return rules
+    return _build_fact_key_tables()[1]
 
 
-@lru_cache(maxsize=1)
-def get_normalizer_key_mapping() -> dict[str, str]:
+def get_normalizer_key_mapping() -> Mapping[str, str]:
     """
-    normalizer の出力キーと canonical キーのマッピングを返す。
+    normalizer の出力キーと canonical キーのマッピングを返す（読み取り専用）。
     normalizer_key が定義されている場合のみ含む。
 
     Returns:
         {"profit_loss": "net_income_attributable_to_parent", ...}
     """
-    config = load_canonical_keys()
-    mapping: dict[str, str] = {}
-    for key, props in config.get("fact_keys", {}).items():
-        if isinstance(props, dict) and "normalizer_key" in props:
-            mapping[props["normalizer_key"]] = key
-    return mapping
+    return _build_fact_key_tables()[2]
 
 
 @lru_cache(maxsize=1)
-def get_accounting_standard_mapping() -> dict[str, str]:
-    """会計基準の表記ゆれ→正規化マッピングを返す。"""
+def get_accounting_standard_mapping() -> Mapping[str, str]:
+    """会計基準の表記ゆれ→正規化マッピングを返す（読み取り専用）。"""
     config = load_canonical_keys()
-    return config.get("accounting_standard_mapping", {})
+    return MappingProxyType(config.get("accounting_standard_mapping", {}))
 
 
 @lru_cache(maxsize=1)
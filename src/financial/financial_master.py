@@ -12,26 +12,38 @@ EPSは再計算可能なためFactレイクに含めない。
 優先順位解決ルールは config/canonical_keys.yaml から読み込む。
 """
 import logging
+from collections.abc import Callable
 from typing import Any
 
 try:
-    from src.config_loader import get_fact_keys, get_normalizer_key_mapping, get_resolution_rules
+    from src.config_loader import get_fact_key_order, get_normalizer_key_mapping, get_resolution_rules
 except ModuleNotFoundError:
-    from config_loader import get_fact_keys, get_normalizer_key_mapping, get_resolution_rules
+    from config_loader import get_fact_key_order, get_normalizer_key_mapping, get_resolution_rules
 
 logger = logging.getLogger(__name__)
 
 _RESOLUTION_RULES = get_resolution_rules()
 _NORMALIZER_KEY_MAP = get_normalizer_key_mapping()
-_FACT_KEYS = get_fact_keys()
+# canonical_keys.yaml の定義順。metrics の出力キー順もこの順になる
+_FACT_KEYS = get_fact_key_order()
 
+# canonical キー -> normalizer 出力キーの逆引き表。同じ canonical キーに複数の
+# normalizer キーが対応する場合は、マッピング定義で先に現れるものを優先する
+_CANONICAL_TO_NORMALIZER: dict[str, str] = {}
+for _nk, _ck in _NORMALIZER_KEY_MAP.items():
+    _CANONICAL_TO_NORMALIZER.setdefault(_ck, _nk)
 
-def _resolve_by_priority(bs: dict[str, Any], candidates: list[str]) -> float | None:
+
+def _resolve_by_priority(bs: dict[str, Any], candidates: tuple[str, ...]) -> float | None:
     """候補キーを優先順位で走査し、最初に有効な値を返す。"""
     for key in candidates:
         v = bs.get(key)
-        if v is not None and isinstance(v, (int, float)):
+        if v is None:
+            continue
+        try:
             return float(v)
+        except (TypeError, ValueError):
+            continue
     return None
 
 
@@ -55,6 +67,37 @@ def _safe_int(value: Any) -> int | None:
         return None
 
 
+def _lookup_int(sources: dict[str, Any], source_key: str) -> int | None:
+    """source_key の値を None安全にintへ変換して返す。"""
+    return _safe_int(sources.get(source_key))
+
+
+def _lookup_float(sources: dict[str, Any], source_key: str) -> float | None:
+    """source_key の値を None安全にfloatへ変換して返す。"""
+    return _safe_float(sources.get(source_key))
+
+
+def _build_fact_dispatch() -> list[tuple[str, Any, Callable[[dict[str, Any], Any], float | int | None]]]:
+    """fact キーごとの (出力キー, 取得元キーまたは候補リスト, 取得関数) を組み立てる。
+
+    resolution ルールが定義されているキーは、複数候補から優先順位で解決する。
+    normalizer_key マッピングが定義されているキーは、normalizer 出力キーから変換する。
+    発行済株式数のみ int、それ以外は float として取得する。
+    """
+    dispatch: list[tuple[str, Any, Callable[[dict[str, Any], Any], float | int | None]]] = []
+    for fact_key in _FACT_KEYS:
+        if fact_key in _RESOLUTION_RULES:
+            dispatch.append((fact_key, _RESOLUTION_RULES[fact_key], _resolve_by_priority))
+            continue
+        source_key = _CANONICAL_TO_NORMALIZER.get(fact_key, fact_key)
+        fn = _lookup_int if fact_key == "total_number_of_issued_shares" else _lookup_float
+        dispatch.append((fact_key, source_key, fn))
+    return dispatch
+
+
+_FACT_DISPATCH = _build_fact_dispatch()
+
+
 def _extract_facts(
     pl: dict[str, Any],
     bs: dict[str, Any],
@@ -64,33 +107,27 @@ def _extract_facts(
     """
     単年分のPL/BS/CF/配当から財務Factのみを抽出する。
     値が取得できなかった項目は None として保持する。
-
-    resolution ルールが定義されているキーは、複数候補から優先順位で解決する。
-    normalizer_key マッピングが定義されているキーは、normalizer 出力キーから変換する。
+    キーごとの取得方法は _FACT_DISPATCH に事前計算済み。
     """
     all_sources = {**pl, **bs, **cf, **dividend}
+    return {fact_key: fn(all_sources, arg) for fact_key, arg, fn in _FACT_DISPATCH}
 
-    result: dict[str, float | int | None] = {}
-    for fact_key in _FACT_KEYS:
-        if fact_key in _RESOLUTION_RULES:
-            result[fact_key] = _resolve_by_priority(all_sources, _RESOLUTION_RULES[fact_key])
-            continue
 
-        source_key = fact_key
-        for nk, ck in _NORMALIZER_KEY_MAP.items():
-            if ck == fact_key:
-                source_key = nk
-                break
+def _extract_year_facts(year: dict[str, Any]) -> dict[str, float | int | None]:
+    """Normalizer出力の年度ブロック（pl/bs/cf/dividend）から財務Factを抽出する。"""
+    return _extract_facts(
+        year.get("pl") or {}, year.get("bs") or {},
+        year.get("cf") or {}, year.get("dividend") or {},
+    )
 
-        raw_value = all_sources.get(source_key)
-        if fact_key == "total_number_of_issued_shares":
-            result[fact_key] = _safe_int(raw_value)
-        elif fact_key == "dividends_per_share":
-            result[fact_key] = _safe_float(raw_value)
-        else:
-            result[fact_key] = _safe_float(raw_value)
 
-    return result
+def _build_year_block(year: dict[str, Any], facts: dict[str, float | int | None]) -> dict[str, Any]:
+    """出力用の年度ブロック {"metrics": ..., "period": ...} を組み立てる。period は存在する場合のみ。"""
+    year_block: dict[str, Any] = {"metrics": facts}
+    period = year.get("period")
+    if period:
+        year_block["period"] = period
+    return year_block
 
 
 class FinancialMaster:
@@ -99,6 +136,8 @@ class FinancialMaster:
     Derived指標は算出しない。Normalizerには影響しない。
     """
 
+    __slots__ = ("_data",)
+
     def __init__(self, normalized_data: dict[str, Any]) -> None:
         self._data = normalized_data
 
@@ -108,46 +147,30 @@ class FinancialMaster:
         有効なFactが存在しない年度はキー自体を出力しない。
         メタデータ（accounting_standard, consolidation_type）をパススルーする。
         """
-        current = self._data.get("current_year") or {}
-        prior = self._data.get("prior_year") or {}
-
-        current_facts = _extract_facts(
-            current.get("pl") or {}, current.get("bs") or {},
-            current.get("cf") or {}, current.get("dividend") or {},
-        )
-        prior_facts = _extract_facts(
-            prior.get("pl") or {}, prior.get("bs") or {},
-            prior.get("cf") or {}, prior.get("dividend") or {},
-        )
+        get = self._data.get
+        current = get("current_year") or {}
+        prior = get("prior_year") or {}
+
+        current_facts = _extract_year_facts(current)
+        prior_facts = _extract_year_facts(prior)
 
         result: dict[str, Any] = {
-            "doc_id": self._data.get("doc_id", ""),
-            "security_code": self._data.get("security_code"),
-            "fiscal_year_end": self._data.get("fiscal_year_end"),
-            "report_type": self._data.get("report_type"),
-            "consolidation_type": self._data.get("consolidation_type"),
-            "accounting_standard": self._data.get("accounting_standard"),
+            "doc_id": get("doc_id", ""),
+            "security_code": get("security_code"),
+            "fiscal_year_end": get("fiscal_year_end"),
+            "report_type": get("report_type"),
+            "consolidation_type": get("consolidation_type"),
+            "accounting_standard": get("accounting_standard"),
         }
 
-        current_has_data = any(v is not None for v in current_facts.values())
-        prior_has_data = any(v is not None for v in prior_facts.values())
-
-        if current_has_data:
-            year_block: dict[str, Any] = {"metrics": current_facts}
-            current_period = current.get("period")
-            if current_period:
-                year_block["period"] = current_period
-            result["current_year"] = year_block
-
-        if prior_has_data:
-            year_block = {"metrics": prior_facts}
-            prior_period = prior.get("period")
-            if prior_period:
-                year_block["period"] = prior_period
-            result["prior_year"] = year_block
-
         current_count = sum(1 for v in current_facts.values() if v is not None)
         prior_count = sum(1 for v in prior_facts.values() if v is not None)
-        logger.info("FinancialMaster compute: doc_id=%s, current=%d facts, prior=%d facts",
+
+        if current_count:
+            result["current_year"] = _build_year_block(current, current_facts)
+        if prior_count:
+            result["prior_year"] = _build_year_block(prior, prior_facts)
+
+        logger.debug("FinancialMaster compute: doc_id=%s, current=%d facts, prior=%d facts",
                      result["doc_id"], current_count, prior_count)
         return result
@@ -18,8 +18,9 @@ else:
     project_root = Path(os.environ.get('PROJECT_ROOT', Path.cwd()))
     src_dir = project_root / "src"
 
-sys.path.insert(0, str(project_root))
-sys.path.insert(0, str(src_dir))
+for _path in (str(project_root), str(src_dir)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 
 from utils import (
     setup_logging,
@@ -8,6 +8,7 @@ FactNormalizer
 import logging
 from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 from typing import Any
 
 try:
@@ -80,11 +81,13 @@ def _is_consolidated_context(context_ref: str) -> bool:
     return "NonConsolidated" not in context_ref
 
 
+@lru_cache(maxsize=4096)
 def _has_member_dimension(context_ref: str) -> bool:
     """contextRef にセグメント/メンバー dimension が含まれるか判定する。
 
     セグメント情報（ReportableSegmentsMember 等）を除外するために使用。
     NonConsolidatedMember は連結/単体区分なので除外対象外。
+    contextRef ID は書類間で共通のものが多いため、プロセス内でキャッシュする。
     """
     if "Member" not in context_ref:
         return False
@@ -101,21 +104,18 @@ def _parse_numeric_value(value: str | None) -> int | None:
 
     XBRL の decimals 属性は精度指標であり単位変換には使わない（XBRL仕様）。
     EDINET の主要財務指標は円単位で統一されているため値をそのまま使用する。
+    int() は前後の空白を許容し、None・空文字は例外となるため事前チェックは不要。
     """
-    if value is None or (isinstance(value, str) and not value.strip()):
-        return None
     try:
-        return int(value.strip())
+        return int(value)
     except (ValueError, TypeError):
         return None
 
 
 def _parse_float_value(value: str | None) -> float | None:
     """文字列を float に変換する。配当等の小数値用。"""
-    if value is None or (isinstance(value, str) and not value.strip()):
-        return None
     try:
-        return float(value.strip())
+        return float(value)
     except (ValueError, TypeError):
         return None
 
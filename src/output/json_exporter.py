@@ -18,6 +18,7 @@ import logging
 import os
 import sys
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -25,6 +26,11 @@ _project_root = Path(__file__).resolve().parent.parent.parent
 if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
+try:
+    import orjson  # 任意依存: 導入済みなら JSON 出力に使用する
+except ImportError:
+    orjson = None
+
 from src import __version__
 try:
     from src.config_loader import (
@@ -54,10 +60,42 @@ _ACCOUNTING_STANDARD_MAP = get_accounting_standard_mapping()
 
 def normalize_security_code(raw: str) -> str:
     """EDINET由来の銘柄コードを正規化する。5桁かつ末尾が'0'の場合のみ末尾1桁を削除。"""
-    s = str(raw).strip()
-    if len(s) == 5 and s.endswith("0"):
-        return s[:4]
-    return s
+    s = raw.strip() if isinstance(raw, str) else str(raw).strip()
+    return s[:4] if len(s) == 5 and s[-1] == "0" else s
+
+
+_QUARTER_BY_MONTH = {3: 1, 6: 2, 9: 3, 12: 4}
+
+
+@lru_cache(maxsize=1024)
+def _data_version(fiscal_year_end: str | None, report_type: str | None) -> str:
+    """決算期・報告書種別から data_version を生成する（純関数のためキャッシュする）。
+
+    警告ログは同じ組み合わせにつき初回のみ出力される。
+    """
+    if not fiscal_year_end:
+        logger.warning("fiscal_year_end is None, using UNKNOWN")
+        return "UNKNOWN"
+
+    try:
+        dt = datetime.strptime(fiscal_year_end, "%Y-%m-%d")
+        year = dt.year
+        month = dt.month
+
+        if report_type == "annual":
+            return f"{year}FY"
+        elif report_type == "quarterly":
+            quarter = _QUARTER_BY_MONTH.get(month)
+            if quarter is None:
+                logger.warning("Unexpected month for quarterly report: %d, using Q4", month)
+                quarter = 4
+            return f"{year}Q{quarter}"
+        else:
+            logger.warning("report_type is %s, treating as annual", report_type or "None")
+            return f"{year}FY"
+    except ValueError as e:
+        logger.warning("Failed to parse fiscal_year_end: %s, using UNKNOWN", e)
+        return "UNKNOWN"
 
 
 def _normalize_accounting_standard(raw: str | None) -> str | None:
@@ -68,6 +106,16 @@ def _normalize_accounting_standard(raw: str | None) -> str | None:
     return _ACCOUNTING_STANDARD_MAP.get(s, s)
 
 
+def dump_json(obj: dict[str, Any]) -> bytes:
+    """インデント2・非ASCIIエスケープなしの JSON バイト列を返す（orjson があれば使用）。
+
+    dataset_manifest.json の出力（DatasetManifestGenerator.save）でも共用する。
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 def _validate_metrics(metrics: dict[str, Any], label: str, security_code: str) -> None:
     """
     出力前バリデーション。
@@ -97,7 +145,13 @@ class JSONExporter:
     全項目がnullの年度ブロックは省略する。
     """
 
-    def __init__(self, base_dir: str | None = None) -> None:
+    def __init__(self, base_dir: str | None = None, update_manifest: bool = True) -> None:
+        """
+        Args:
+            base_dir: 出力先のベースパス。None の場合は DATASET_PATH 環境変数を使用。
+            update_manifest: export ごとに dataset_manifest.json を再生成するか。
+                             一括処理で最後に1回だけ生成する場合は False を指定する。
+        """
         if base_dir is None:
             base_dir_str = os.environ.get("DATASET_PATH")
             if not base_dir_str:
@@ -108,35 +162,13 @@ class JSONExporter:
             base_dir = base_dir_str
 
         self.base_dir = Path(base_dir)
+        self.update_manifest = update_manifest
 
     def _generate_data_version(
         self, fiscal_year_end: str | None, report_type: str | None,
     ) -> str:
         """決算期から data_version を生成。"""
-        if not fiscal_year_end:
-            logger.warning("fiscal_year_end is None, using UNKNOWN")
-            return "UNKNOWN"
-
-        try:
-            dt = datetime.strptime(fiscal_year_end, "%Y-%m-%d")
-            year = dt.year
-            month = dt.month
-
-            if report_type == "annual":
-                return f"{year}FY"
-            elif report_type == "quarterly":
-                quarter_map = {3: 1, 6: 2, 9: 3, 12: 4}
-                quarter = quarter_map.get(month)
-                if quarter is None:
-                    logger.warning("Unexpected month for quarterly report: %d, using Q4", month)
-                    quarter = 4
-                return f"{year}Q{quarter}"
-            else:
-                logger.warning("report_type is %s, treating as annual", report_type or "None")
-                return f"{year}FY"
-        except ValueError as e:
-            logger.warning("Failed to parse fiscal_year_end: %s, using UNKNOWN", e)
-            return "UNKNOWN"
+        return _data_version(fiscal_year_end, report_type)
 
     def _sanitize_metrics(self, year_data: dict[str, Any]) -> dict[str, float | int | None] | None:
         """
@@ -242,18 +274,22 @@ class JSONExporter:
                 prior_block["period"] = prior_period
             output_dict["prior_year"] = prior_block
 
+        # 一時ファイルへ書き出してから置換し、並列実行時も書きかけのJSONを残さない
         output_path = output_dir / f"{sc}.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output_dict, f, indent=2, ensure_ascii=False)
+        tmp_path = output_dir / f".{sc}.json.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(dump_json(output_dict))
+        os.replace(tmp_path, output_path)
 
         logger.info("JSONExporter: 保存完了 - %s (data_version=%s)", output_path, data_version)
 
-        try:
-            from src.output.manifest_generator import DatasetManifestGenerator
-            manifest_generator = DatasetManifestGenerator()
-            manifest_path = manifest_generator.save()
-            logger.info("Dataset manifest generated: %s", manifest_path)
-        except Exception as e:
-            logger.warning("Failed to generate dataset manifest: %s", e)
+        if self.update_manifest:
+            try:
+                from src.output.manifest_generator import DatasetManifestGenerator
+                manifest_generator = DatasetManifestGenerator()
+                manifest_path = manifest_generator.save()
+                logger.info("Dataset manifest generated: %s", manifest_path)
+            except Exception as e:
+                logger.warning("Failed to generate dataset manifest: %s", e)
 
         return str(output_path)
@@ -7,7 +7,6 @@ Data Repo内のフォルダをスキャンし、dataset_manifest.json を自動
 外部データリポジトリ（financial-dataset）をスキャンする。
 DATASET_PATH 環境変数でスキャン先を指定する。
 """
-import json
 import logging
 import os
 import sys
@@ -21,6 +20,8 @@ if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
 from src import __version__
+# JSON の出力形式は JSONExporter と共通（orjson の有無による分岐も含めて1か所で定義する）
+from .json_exporter import dump_json
 
 logger = logging.getLogger(__name__)
 
@@ -177,8 +178,7 @@ class DatasetManifestGenerator:
 
         # JSONファイルに保存
         output_path = metadata_dir / "dataset_manifest.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        output_path.write_bytes(dump_json(manifest))
 
         logger.info("Manifest saved to: %s", output_path)
         return str(output_path)
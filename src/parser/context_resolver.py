@@ -15,6 +15,10 @@ from lxml import etree
 logger = logging.getLogger(__name__)
 
 XBRLI_NS = "http://www.xbrl.org/2003/instance"
+_PERIOD_TAG = f"{{{XBRLI_NS}}}period"
+_INSTANT_TAG = f"{{{XBRLI_NS}}}instant"
+_START_DATE_TAG = f"{{{XBRLI_NS}}}startDate"
+_END_DATE_TAG = f"{{{XBRLI_NS}}}endDate"
 
 
 class ContextResolver:
@@ -27,6 +31,11 @@ class ContextResolver:
       - instant:  {"type": "instant", "date": "..."}
     """
 
+    # xbrli:context をC実装のXPathで一括取得する（コメント等の非要素ノードは対象外）。
+    # context はルート（xbrli:xbrl）直下にのみ現れるため子要素だけを見て、
+    # entity / period / scenario の子孫には降りない。
+    _XP_CONTEXTS = etree.XPath("xbrli:context", namespaces={"xbrli": XBRLI_NS})
+
     def __init__(self, xbrl_root: etree._Element) -> None:
         self._root = xbrl_root
         self._context_map: dict[str, dict[str, Any]] | None = None
@@ -43,23 +52,18 @@ class ContextResolver:
 
         context_map: dict[str, dict[str, Any]] = {}
 
-        for context_elem in self._root.iter():
-            if etree.QName(context_elem).namespace != XBRLI_NS:
-                continue
-            if etree.QName(context_elem).localname != "context":
-                continue
-
+        for context_elem in self._XP_CONTEXTS(self._root):
             context_id = context_elem.get("id")
             if not context_id:
                 continue
 
-            period_elem = context_elem.find(f"{{{XBRLI_NS}}}period")
+            period_elem = context_elem.find(_PERIOD_TAG)
             if period_elem is None:
                 continue
 
-            instant_elem = period_elem.find(f"{{{XBRLI_NS}}}instant")
-            start_date_elem = period_elem.find(f"{{{XBRLI_NS}}}startDate")
-            end_date_elem = period_elem.find(f"{{{XBRLI_NS}}}endDate")
+            instant_elem = period_elem.find(_INSTANT_TAG)
+            start_date_elem = period_elem.find(_START_DATE_TAG)
+            end_date_elem = period_elem.find(_END_DATE_TAG)
 
             if instant_elem is not None and instant_elem.text:
                 context_map[context_id] = {
@@ -4,6 +4,8 @@ XBRLパーサー
 """
 import re
 import logging
+import threading
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
@@ -16,10 +18,54 @@ LINK_NS = "http://www.xbrl.org/2003/linkbase"
 XLINK_NS = "http://www.w3.org/1999/xlink"
 XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
 _XSI_NIL_ATTR = f"{{{XSI_NS}}}nil"
+_XLINK_HREF_ATTR = f"{{{XLINK_NS}}}href"
 # 除外する要素のローカル名
 EXCLUDED_LOCAL_NAMES = frozenset(("context", "unit", "schemaRef"))
 # taxonomy_version 抽出用の日付パターン（YYYY-MM-DD）
 TAXONOMY_DATE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})")
+# XMLPullParser へ渡すファイル読み込み単位（バイト）
+_READ_CHUNK_SIZE = 1 << 16
+
+# ファイルごとにパーサーを生成せず、スレッドごとに1つの XMLPullParser を使い回す
+_thread_local = threading.local()
+
+
+def _pull_parser() -> etree.XMLPullParser:
+    """このスレッド用の XMLPullParser を返す（初回のみ生成）。
+
+    要素間の空白テキストノード・コメントは保持せず、巨大な提出書類も libxml2 の上限で拒否しない。
+    XBRL では id 属性による要素参照（getElementById）を使わないため ID 表は作らない。
+    """
+    parser = getattr(_thread_local, "parser", None)
+    if parser is None:
+        parser = etree.XMLPullParser(
+            events=("end",),
+            recover=False, remove_blank_text=True, remove_comments=True,
+            huge_tree=True, collect_ids=False,
+        )
+        _thread_local.parser = parser
+    return parser
+
+
+def _iter_end_events(path: Path) -> Iterator[tuple[str, etree._Element]]:
+    """ファイルを逐次パーサーへ流し込み、要素の end イベントを順に返す（iterparse 相当）。"""
+    parser = _pull_parser()
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(_READ_CHUNK_SIZE):
+                parser.feed(chunk)
+                yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+    except BaseException:
+        # 途中で失敗・中断した場合も次のファイルで使えるよう、パーサーの状態を破棄する
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        for _ in parser.read_events():
+            pass
+        raise
 
 
 def _ns_to_prefix_map(root: etree._Element) -> dict[str, str]:
@@ -75,65 +121,75 @@ class XBRLParser:
         taxonomy_version = ""
         facts: list[dict[str, str]] = []
 
-        parser = etree.XMLParser(recover=False, remove_blank_text=False)
+        # ストリーム処理し、抽出済みの fact 要素やルート直下の不要要素はツリーから切り離す。
+        # context / unit / schemaRef はツリーに残すため、ContextResolver(root) はそのまま使える。
+        events = _iter_end_events(self._path)
+        root: etree._Element | None = None
+        ns_to_prefix: dict[str, str] = {}
+        schema_ref_seen = False
         try:
-            tree = etree.parse(str(self._path), parser=parser)
-        except etree.XMLSyntaxError as e:
+            for _event, elem in events:
+                if root is None:
+                    root = elem.getroottree().getroot()
+                    ns_to_prefix = _ns_to_prefix_map(root)
+
+                tag_qname = elem.tag
+                if not isinstance(tag_qname, str):
+                    continue
+                if tag_qname.startswith("{"):
+                    ns_uri, _, local = tag_qname[1:].partition("}")
+                else:
+                    ns_uri = ""
+                    local = tag_qname
+
+                # schemaRef から taxonomy_version（YYYY-MM-DD）を抽出
+                # link:schemaRef の xlink:href に含まれる日付のうち最初のものを使用
+                if local == "schemaRef" and not schema_ref_seen:
+                    schema_ref_seen = True
+                    href = elem.get(_XLINK_HREF_ATTR)
+                    if href:
+                        m = TAXONOMY_DATE_PATTERN.search(href)
+                        if m:
+                            taxonomy_version = m.group(1)
+                    continue
+
+                # contextRef を持つ要素を fact として収集（link/xlink/context/unit/schemaRef は除外）
+                context_ref = elem.get("contextRef")
+                if context_ref is None or ns_uri in (LINK_NS, XLINK_NS) or local in EXCLUDED_LOCAL_NAMES:
+                    # ルート直下の context / unit / schemaRef 以外（footnoteLink・roleRef 等）は
+                    # 以降参照しないため、保持するツリーから切り離す
+                    if local not in EXCLUDED_LOCAL_NAMES and elem.getparent() is root:
+                        elem.clear()
+                        root.remove(elem)
+                    continue
+
+                tag = _qname_for_element(elem, ns_to_prefix)
+                unit_ref = elem.get("unitRef") or ""
+                decimals = elem.get("decimals", "")
+                is_nil = elem.get(_XSI_NIL_ATTR, "").lower() == "true"
+                value = "" if is_nil else _get_text(elem)
+
+                facts.append({
+                    "tag": tag,
+                    "contextRef": context_ref,
+                    "unitRef": unit_ref,
+                    "decimals": decimals,
+                    "value": value,
+                    "is_nil": is_nil,
+                })
+
+                elem.clear()
+                parent = elem.getparent()
+                if parent is not None:
+                    parent.remove(elem)
+        except etree.XMLSyntaxError:
             logger.exception("XBRLのパースに失敗しました: %s", self._path)
             raise
+        finally:
+            # ループ本体で例外が出てもスレッド共有のパーサーを必ずリセットする
+            events.close()
 
-        root = tree.getroot()
         self._root = root
-        ns_to_prefix = _ns_to_prefix_map(root)
-
-        # schemaRef から taxonomy_version（YYYY-MM-DD）を抽出
-        # link:schemaRef の xlink:href に含まれる日付のうち最初のものを使用
-        xlink_href = f"{{{XLINK_NS}}}href"
-        for elem in root.iter():
-            if etree.QName(elem).localname == "schemaRef":
-                href = elem.get(xlink_href)
-                if href:
-                    m = TAXONOMY_DATE_PATTERN.search(href)
-                    if m:
-                        taxonomy_version = m.group(1)
-                        break
-                break
-
-        # contextRef を持つ要素を fact として収集（link/xlink/context/unit/schemaRef は除外）
-        for elem in root.iter():
-            context_ref = elem.get("contextRef")
-            if context_ref is None:
-                continue
-
-            tag_qname = elem.tag
-            if not isinstance(tag_qname, str):
-                continue
-            if tag_qname.startswith("{"):
-                ns_uri = tag_qname[1 : tag_qname.index("}")]
-                local = etree.QName(elem).localname
-            else:
-                ns_uri = ""
-                local = tag_qname
-
-            if ns_uri in (LINK_NS, XLINK_NS):
-                continue
-            if local in EXCLUDED_LOCAL_NAMES:
-                continue
-
-            tag = _qname_for_element(elem, ns_to_prefix)
-            unit_ref = elem.get("unitRef") or ""
-            decimals = elem.get("decimals", "")
-            is_nil = elem.get(_XSI_NIL_ATTR, "").lower() == "true"
-            value = "" if is_nil else _get_text(elem)
-
-            facts.append({
-                "tag": tag,
-                "contextRef": context_ref,
-                "unitRef": unit_ref,
-                "decimals": decimals,
-                "value": value,
-                "is_nil": is_nil,
-            })
 
         return {
             "doc_id": doc_id,
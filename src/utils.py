@@ -3,6 +3,8 @@
 """
 import logging
 import os
+import re
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Dict, Any
 from datetime import datetime, timezone, timedelta
@@ -231,3 +233,25 @@ def debug_log_documents(
             )
         if len(filtered_030000) > 10:
             logger.info(f"[DEBUG]   ... 他 {len(filtered_030000) - 10}件")
+
+
+def scandir_xbrl(root: str, skip_re: re.Pattern | None = None) -> Iterator[str]:
+    """root 配下を os.scandir で反復走査し、.xbrl ファイルパスを返す。
+
+    skip_re に一致するファイル名は除外する（None なら除外しない）。
+    読めないサブディレクトリは走査全体を止めずに飛ばす。
+    """
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if name.endswith(".xbrl"):
+                    if (skip_re is None or skip_re.search(name) is None) and entry.is_file():
+                        yield entry.path
+                elif entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)